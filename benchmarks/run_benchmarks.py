@@ -0,0 +1,266 @@
+# benchmarks/run_benchmarks.py
+"""
+End-to-end throughput benchmarks on fake models.
+
+Runs detection_core against the deterministic fake backend
+(inference/fake.py) over synthetic images, and reports p50/p95 latency
+per stage, images/sec and peak RSS per scenario. Results can be saved as
+a baseline JSON and compared against on later runs.
+
+    python -m benchmarks.run_benchmarks --scenarios single batch100 --save-baseline bench.json
+    python -m benchmarks.run_benchmarks --compare bench.json
+
+Stages timed per image:
+    run_inference_on_path   the full per-image path (decode, predict, parse, comment, draw, persist)
+    run_inference_vector    the same path with annotate="vector" (no raster copy written)
+    decode                  utils.decode.decode_image at inference resolution
+    generate_comments       inference.commenter.generate_comments
+    draw_boxes              utils.viz.draw_boxes (full-resolution raster annotation)
+    save_to_excel           detection_core.save_to_excel into a separate workbook
+
+Bytes per image are reported for both annotation modes, so the
+raster/vector difference is measured rather than assumed:
+    output_bytes_per_image    size of the results folder afterwards
+    written_bytes_per_image   the process's write() volume while it ran
+                              (/proc/self/io wchar, Linux only), which also
+                              counts every workbook rewrite and database write
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCENARIOS = {
+    "single": 1,
+    "batch100": 100,
+    "batch10k": 10_000,
+}
+
+STAGES = ("run_inference_on_path", "run_inference_vector", "decode", "generate_comments", "draw_boxes", "save_to_excel")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(samples_ms):
+    s = sorted(samples_ms)
+    return {
+        "n": len(s),
+        "p50_ms": round(percentile(s, 0.50), 3),
+        "p95_ms": round(percentile(s, 0.95), 3),
+        "mean_ms": round(sum(s) / len(s), 3) if s else 0.0,
+    }
+
+
+def reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets VmHWM so each scenario gets its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        import psutil  # optional, Windows
+        return psutil.Process().memory_info().peak_wset / (1024.0 * 1024.0)
+    except (ImportError, AttributeError):
+        return None
+
+
+def bytes_written():
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def dir_bytes(path):
+    return sum(p.stat().st_size for p in Path(path).iterdir() if p.is_file())
+
+
+def run_scenario(core, files, work_dir):
+    from inference.commenter import generate_comments
+    from utils.decode import decode_image
+    from utils.viz import draw_boxes
+
+    results_dir = Path(work_dir) / "results"
+    vector_dir = Path(work_dir) / "results_vector"
+    stage_dir = Path(work_dir) / "stages"
+    results_dir.mkdir(parents=True, exist_ok=True)
+    vector_dir.mkdir(parents=True, exist_ok=True)
+    stage_dir.mkdir(parents=True, exist_ok=True)
+
+    timings = {s: [] for s in STAGES}
+    side = core.inference_side(core.models)
+
+    detections = {}  # path -> detections, reused by the isolated stages below
+
+    reset_peak_rss()
+    wchar_start = bytes_written()
+    wall_start = time.perf_counter()
+    for f in files:
+        t = time.perf_counter()
+        _, dets, _ = core.run_inference_on_path(f, results_dir)
+        timings["run_inference_on_path"].append((time.perf_counter() - t) * 1000.0)
+        detections[f] = dets
+    wall = time.perf_counter() - wall_start
+    wchar_raster = bytes_written()
+
+    for f in files:
+        t = time.perf_counter()
+        core.run_inference_on_path(f, vector_dir, annotate=core.ANNOTATE_VECTOR)
+        timings["run_inference_vector"].append((time.perf_counter() - t) * 1000.0)
+    wchar_vector = bytes_written()
+
+    n = max(len(files), 1)
+    output = {"raster": dir_bytes(results_dir) // n, "vector": dir_bytes(vector_dir) // n}
+    written = None
+    if wchar_start is not None:
+        written = {"raster": (wchar_raster - wchar_start) // n, "vector": (wchar_vector - wchar_raster) // n}
+
+    # Individual stages on the same inputs, timed in isolation
+    for f in files:
+        dets = detections[f]
+
+        t = time.perf_counter()
+        decode_image(f, min_side=side)
+        timings["decode"].append((time.perf_counter() - t) * 1000.0)
+
+        t = time.perf_counter()
+        comments = generate_comments(dets)
+        timings["generate_comments"].append((time.perf_counter() - t) * 1000.0)
+
+        t = time.perf_counter()
+        draw_boxes(f, dets, str(stage_dir / f"annotated_{Path(f).name}"))
+        timings["draw_boxes"].append((time.perf_counter() - t) * 1000.0)
+
+        t = time.perf_counter()
+        core.save_to_excel(stage_dir, f, "", dets, comments)
+        timings["save_to_excel"].append((time.perf_counter() - t) * 1000.0)
+
+    return {
+        "images": len(files),
+        "wall_s": round(wall, 3),
+        "images_per_sec": round(len(files) / wall, 3) if wall > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "output_bytes_per_image": output,
+        "written_bytes_per_image": written,
+        "stages": {s: summarize(v) for s, v in timings.items()},
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Print p95 changes against a baseline. Returns the list of regressions."""
+    regressions = []
+    for key, cur in report["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        for stage, stats in cur["stages"].items():
+            b = base["stages"].get(stage)
+            if not b or not b["p95_ms"]:
+                continue
+            ratio = stats["p95_ms"] / b["p95_ms"]
+            flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+            print(f"  {key:<20} {stage:<22} p95 {b['p95_ms']:>9.2f} -> {stats['p95_ms']:>9.2f} ms"
+                  f" ({(ratio - 1) * 100:+.0f}%){flag}")
+            if flag:
+                regressions.append((key, stage, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark detection_core on fake models")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=["single", "batch100"])
+    parser.add_argument("--resolutions", nargs="+", default=["vga", "fullhd", "20mp"])
+    parser.add_argument("--boxes", type=int, default=5, help="Fake boxes per model per image")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated model latency")
+    parser.add_argument("--work-dir", help="Where synthetic images and outputs go (default: temp dir)")
+    parser.add_argument("--save-baseline", help="Write the report JSON here")
+    parser.add_argument("--compare", help="Baseline JSON to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    # Must be set before detection_core loads its models
+    os.environ["ANOMALY_DETECTOR_BACKEND"] = "fake"
+    os.environ["ANOMALY_DETECTOR_FAKE_BOXES"] = str(args.boxes)
+    os.environ["ANOMALY_DETECTOR_FAKE_LATENCY_MS"] = str(args.latency_ms)
+
+    from benchmarks.synthetic import make_dataset
+    import detection_core as core
+
+    work_root = Path(args.work_dir or tempfile.mkdtemp(prefix="anomaly_bench_"))
+    # Keep benchmark rows out of the real findings database
+    core.FINDINGS_DB = work_root / "findings.db"
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "boxes_per_model": args.boxes,
+            "models": list(core.models),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": {},
+    }
+
+    for scenario in args.scenarios:
+        for res in args.resolutions:
+            key = f"{scenario}/{res}"
+            files = make_dataset(work_root / "images", res, SCENARIOS[scenario])
+            print(f"\n=== {key}: {len(files)} images ===")
+            r = run_scenario(core, files, work_root / "runs" / scenario / res)
+            report["results"][key] = r
+            print(f"  {r['images_per_sec']} images/sec, peak RSS {r['peak_rss_mb']} MB")
+            for what in ("output", "written"):
+                b = r[f"{what}_bytes_per_image"]
+                if b:
+                    print(f"  {what} per image: raster {b['raster']} B, vector {b['vector']} B"
+                          f" ({b['raster'] / max(b['vector'], 1):.1f}x)")
+            for stage, st in r["stages"].items():
+                print(f"  {stage:<22} p50 {st['p50_ms']:>9.2f} ms   p95 {st['p95_ms']:>9.2f} ms")
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print("\nBaseline saved:", args.save_baseline)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print("\nComparison with", args.compare)
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
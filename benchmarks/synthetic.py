@@ -0,0 +1,54 @@
+# benchmarks/synthetic.py
+"""Deterministic synthetic JPEGs at the resolutions we see in the field."""
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+RESOLUTIONS = {
+    "vga": (640, 480),
+    "fullhd": (1920, 1080),
+    "20mp": (5472, 3648),
+}
+
+
+def make_image(path, width, height, seed=0, quality=90):
+    """Gradient background plus random rectangles: compresses like a photo, not like noise."""
+    rng = np.random.default_rng(seed)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)
+    base = np.empty((height, width, 3), dtype=np.uint8)
+    base[..., 0] = (xs[None, :] * 0.7 + ys[:, None] * 0.3).astype(np.uint8)
+    base[..., 1] = (ys[:, None] * 0.8).astype(np.uint8)
+    base[..., 2] = (255 - xs[None, :]).astype(np.uint8)
+
+    img = Image.fromarray(base)
+    draw = ImageDraw.Draw(img)
+    for _ in range(24):
+        x1, y1 = rng.integers(0, width - 10), rng.integers(0, height - 10)
+        x2 = min(width, x1 + rng.integers(10, max(11, width // 4)))
+        y2 = min(height, y1 + rng.integers(10, max(11, height // 4)))
+        draw.rectangle([int(x1), int(y1), int(x2), int(y2)], fill=tuple(int(c) for c in rng.integers(0, 256, 3)))
+
+    img.save(path, quality=quality)
+    return str(path)
+
+
+def make_dataset(folder, resolution, count, distinct=16):
+    """
+    Paths for `count` images at `resolution`. Only `distinct` files are
+    written and then cycled, so a 10k-image scenario doesn't need 10k files
+    on disk.
+    """
+    width, height = RESOLUTIONS[resolution]
+    folder = Path(folder) / resolution
+    folder.mkdir(parents=True, exist_ok=True)
+
+    files = []
+    for i in range(min(distinct, count)):
+        p = folder / f"synthetic_{i:03d}.jpg"
+        if not p.exists():
+            make_image(p, width, height, seed=i)
+        files.append(str(p).replace("\\", "/"))
+
+    return [files[i % len(files)] for i in range(count)]
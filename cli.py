@@ -0,0 +1,290 @@
+# cli.py
+"""
+Headless batch runner.
+
+Runs the selected models over files, directories or globs into a normal
+session folder (uploads/, results/results.xlsx, journal.log - the same
+layout the app writes), and streams one NDJSON record per image to stdout
+or a file while it runs, followed by a summary record.
+
+    python cli.py site_photos/ "archive/**/*.jpg" --models ppe fire --concurrency 4
+    python cli.py /data/inbox --output audit.ndjson --fail-on critical
+
+Exit status:
+    0  finished, no anomalies at or above --fail-on
+    1  anomalies at or above --fail-on (label rules with `type: anomaly`)
+    2  bad arguments or no input images
+    3  no qualifying anomalies, but some images failed (including inputs that
+       could not be copied into the session)
+    130  cancelled (Ctrl+C or SIGTERM) before every image was processed;
+       resume the session from the app
+
+When streaming to stdout, everything else the pipeline prints (including
+from worker processes) is sent to stderr so stdout stays valid NDJSON.
+"""
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import shutil
+import signal
+import sys
+import threading
+from pathlib import Path
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+EXIT_OK = 0
+EXIT_ANOMALIES = 1
+EXIT_USAGE = 2
+EXIT_ERRORS = 3
+EXIT_CANCELLED = 130  # 128 + SIGINT, as shells report an interrupted command
+
+
+def expand_inputs(inputs, recursive=False):
+    """Image files from paths, directories and glob patterns, deduplicated in input order."""
+    found = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            pattern = "**/*" if recursive else "*"
+            candidates = sorted(p.glob(pattern))
+        elif p.is_file():
+            candidates = [p]
+        else:
+            candidates = sorted(Path(m) for m in glob.glob(item, recursive=True))
+        found.extend(c for c in candidates if c.is_file() and c.suffix.lower() in IMAGE_EXTS)
+    return list(dict.fromkeys(str(f.resolve()) for f in found))
+
+
+def copy_to_uploads(files, upload_dir):
+    """
+    Copy inputs into the session like the app does. Returns
+    ({upload path: source path}, [(source path, error)] for inputs that failed).
+    """
+    sources, failed = {}, []
+    for f in files:
+        dest = upload_dir / Path(f).name
+        n = 1
+        while dest.as_posix() in sources:
+            # Same file name from different folders
+            dest = upload_dir / f"{Path(f).stem}_{n}{Path(f).suffix}"
+            n += 1
+        try:
+            shutil.copy(f, dest)
+            sources[dest.as_posix()] = f
+        except Exception as e:
+            print("Error copying:", e)
+            failed.append((f, e))
+    return sources, failed
+
+
+def image_record(session, image_path, source, result, error, min_confidence):
+    from inference.commenter import anomaly_severity
+
+    if error is not None:
+        return {"type": "image", "session": session, "image": image_path, "source": source,
+                "error": str(error)}
+
+    out, dets, comments = result
+    anomalies = []
+    for d in dets:
+        severity = anomaly_severity(d.get("label", ""))
+        if severity is not None and d.get("confidence", 0.0) >= min_confidence:
+            anomalies.append({"label": d["label"], "severity": severity,
+                              "confidence": round(float(d["confidence"]), 4), "bbox": d.get("bbox")})
+    return {
+        "type": "image",
+        "session": session,
+        "image": image_path,
+        "source": source,
+        "annotated": out if out != image_path else "",
+        "detections": dets,
+        "comments": comments,
+        "anomalies": anomalies,
+    }
+
+
+def run_batch(files, stream, model_names=None, concurrency=1, fail_on="high", min_confidence=0.0,
+              annotate="raster", skip_duplicates=False, sessions_root=None, findings_db=None):
+    """
+    Process files into a new session, writing NDJSON to `stream`. Returns the exit status.
+    The findings database defaults to <sessions_root>/findings.db when a root is given,
+    so a container writes everything to its mounted volume.
+    """
+    import detection_core as core
+    from inference.commenter import SEVERITY_LEVELS
+    from scheduler import WorkScheduler
+    from utils.journal import SessionJournal
+
+    unknown = set(model_names or []) - set(core.cfg["models"])
+    if unknown:
+        print("Unknown models:", ", ".join(sorted(unknown)), file=sys.stderr)
+        return EXIT_USAGE
+    run_models = core.get_models(model_names)
+    if not run_models:
+        print("No models could be loaded for:", ", ".join(model_names or ["(all)"]), file=sys.stderr)
+        return EXIT_USAGE
+
+    if findings_db is None and sessions_root is not None:
+        findings_db = Path(sessions_root) / "findings.db"
+    if findings_db is not None:
+        core.use_findings_db(findings_db)
+
+    session_folder = core.create_session_folder(sessions_root)
+    sources, copy_failed = copy_to_uploads(files, session_folder / "uploads")
+    uploads = list(sources)
+
+    journal = SessionJournal(session_folder)
+    journal.queue(uploads)
+
+    pool = None
+    if concurrency > 1:
+        from process_pool import InferencePool
+        pool = InferencePool(concurrency, model_names=list(run_models))
+
+    ctx = core.new_session_context(session_folder, uploads, run_models, journal=journal,
+                                   skip_duplicates=skip_duplicates, annotate=annotate, pool=pool)
+
+    threshold = SEVERITY_LEVELS.index(fail_on) if fail_on != "none" else None
+    totals = {"images": 0, "errors": len(copy_failed), "anomalies": {s: 0 for s in SEVERITY_LEVELS}}
+    write_lock = threading.Lock()
+    done = threading.Event()
+    terminated = threading.Event()
+
+    for source, e in copy_failed:
+        rec = {"type": "image", "session": session_folder.name, "image": "", "source": source,
+               "error": f"copy failed: {e}"}
+        stream.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+    stream.flush()
+
+    def on_result(task, result, error):
+        rec = image_record(session_folder.name, task.path, sources.get(task.path), result, error,
+                           min_confidence)
+        with write_lock:
+            totals["images"] += 1
+            if error is not None:
+                totals["errors"] += 1
+            for a in rec.get("anomalies", []):
+                totals["anomalies"][a["severity"]] += 1
+            stream.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+            stream.flush()
+
+    def handle(task, checkpoint):
+        return core.process_session_image(task.path, task.session.context, checkpoint=checkpoint)
+
+    scheduler = WorkScheduler(handle, on_result=on_result, on_session_done=lambda s: done.set(),
+                              max_sessions=1, workers=pool.size if pool is not None else 1)
+    if pool is not None:
+        core.governor.tune(scheduler.set_workers, 1, pool.size, pool.size, "pipeline workers")
+    session = scheduler.submit_session(uploads, ctx)
+
+    def cancel(reason):
+        print(f"{reason}: cancelling (resume the session from the app)", file=sys.stderr)
+        scheduler.cancel(session)
+        done.wait()
+
+    # SIGTERM (docker stop, systemd, CI timeouts) takes the same path as Ctrl+C.
+    # Handlers can only be installed from the main thread.
+    previous_sigterm = None
+    if threading.current_thread() is threading.main_thread():
+        previous_sigterm = signal.signal(signal.SIGTERM, lambda signum, frame: terminated.set())
+    try:
+        while not done.wait(0.5):
+            if terminated.is_set():
+                cancel("Terminated")
+                break
+    except KeyboardInterrupt:
+        cancel("Interrupted")
+    finally:
+        if previous_sigterm is not None:
+            signal.signal(signal.SIGTERM, previous_sigterm)
+        scheduler.shutdown()
+        journal.close()
+        if pool is not None:
+            pool.shutdown()
+
+    failing = sum(n for s, n in totals["anomalies"].items()
+                  if threshold is not None and SEVERITY_LEVELS.index(s) >= threshold)
+    if session.cancelled or totals["images"] < len(uploads):
+        # Anomalies or not, an incomplete run must not pass as a clean one
+        status = EXIT_CANCELLED
+    elif failing:
+        status = EXIT_ANOMALIES
+    elif totals["errors"]:
+        status = EXIT_ERRORS
+    else:
+        status = EXIT_OK
+
+    stream.write(json.dumps({
+        "type": "summary",
+        "session": session_folder.name,
+        "session_folder": session_folder.as_posix(),
+        "images": totals["images"],
+        "errors": totals["errors"],
+        "anomalies": totals["anomalies"],
+        "cancelled": session.cancelled,
+        "fail_on": fail_on,
+        "exit_code": status,
+    }, separators=(",", ":")) + "\n")
+    stream.flush()
+    return status
+
+
+def main(argv=None):
+    from inference.commenter import SEVERITY_LEVELS
+
+    parser = argparse.ArgumentParser(description="Run anomaly detection over images without the GUI")
+    parser.add_argument("inputs", nargs="+", help="Image files, directories or glob patterns")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Descend into subdirectories")
+    parser.add_argument("--models", nargs="+", help="Models to run (default: all configured)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Inference worker processes (1 = in this process)")
+    parser.add_argument("--output", default="-", help="NDJSON destination file ('-' = stdout)")
+    parser.add_argument("--fail-on", choices=list(SEVERITY_LEVELS) + ["none"], default="high",
+                        help="Exit 1 if any anomaly has at least this severity")
+    parser.add_argument("--min-confidence", type=float, default=0.0,
+                        help="Ignore anomalies below this confidence for --fail-on")
+    parser.add_argument("--annotate", choices=["raster", "vector"], default="raster",
+                        help="raster writes annotated copies; vector keeps only the geometry")
+    parser.add_argument("--skip-duplicates", action="store_true", help="Reuse results for near-duplicates")
+    parser.add_argument("--sessions-root", help="Parent folder for the session (default: sessions/)")
+    parser.add_argument("--findings-db",
+                        help="Findings database (default: findings.db in the sessions root)")
+    parser.add_argument("--telemetry", action="store_true", help="Write per-stage timings to the session")
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs, args.recursive)
+    if not files:
+        print("No input images found.", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.output == "-":
+        # Keep a private handle on stdout for the NDJSON, then point fd 1 (this
+        # process, C libraries and spawned workers alike) at stderr
+        sys.stdout.flush()
+        stream = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    else:
+        stream = open(args.output, "w", encoding="utf-8")
+
+    if args.telemetry:
+        from utils import telemetry
+        telemetry.enable()
+
+    try:
+        status = run_batch(files, stream, model_names=args.models, concurrency=args.concurrency,
+                           fail_on=args.fail_on, min_confidence=args.min_confidence,
+                           annotate=args.annotate, skip_duplicates=args.skip_duplicates,
+                           sessions_root=args.sessions_root, findings_db=args.findings_db)
+    finally:
+        if args.telemetry:
+            telemetry.disable()
+        stream.close()
+    return status
+
+
+if __name__ == "__main__":
+    mp.freeze_support()
+    sys.exit(main())
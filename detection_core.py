@@ -1,28 +1,141 @@
 # detection_core.py
 
 import os
+import json
 import datetime
+import threading
 from pathlib import Path
 
-from streamlit import json
-from inference.detector import load_models
+from inference.detector import load_models, model_config
 from inference.commenter import generate_comments
 from utils.viz import draw_boxes
+from utils.journal import INFERRED, ANNOTATED, PERSISTED, unfinished_images
+from utils.phash import BKTree, DUPLICATE_DISTANCE, dhash
+from utils.decode import decode_image, format_stats, upright_size
+from utils.findings_store import FindingsStore
+from utils import telemetry
+from utils.governor import ResourceGovernor
+from process_pool import physical_cores
 from openpyxl import Workbook, load_workbook
 
 # Base directory (Desktop_App/)
 BASE_DIR = Path(__file__).parent
 
-# Load YOLO models ONCE globally (Ultralytics YOLO v11 assumed)
-cfg, models = load_models()
+# Thread budget per library; the environment part must precede torch's import in load_models
+governor = ResourceGovernor(physical_cores())
+governor.limit_environment()
+
+# YOLO models are loaded once, on first use (Ultralytics YOLO v11 assumed), so
+# importing this module stays cheap for scripts that only need part of it.
+# `detection_core.models` / `cfg` still work through the module __getattr__.
+_models = {}
+_missing_models = set()
+_models_lock = threading.Lock()
+
+
+def get_models(names=None):
+    """{name: model} for `names` (default: every configured model), loading any not loaded yet."""
+    wanted = list(names) if names else list(model_config()["models"])
+    with _models_lock:
+        to_load = [n for n in wanted if n not in _models and n not in _missing_models]
+        if to_load:
+            _, loaded = load_models(names=to_load)
+            _models.update(loaded)
+            _missing_models.update(set(to_load) - set(loaded))
+            first_torch = governor.torch_threads is None
+            governor.apply_thread_limits()
+            if first_torch:
+                tune_in_process()
+        return {n: _models[n] for n in wanted if n in _models}
+
+
+def __getattr__(name):
+    if name == "models":
+        return get_models()
+    if name == "cfg":
+        return model_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Annotation modes:
+#   raster -> write a full-size annotated_<name> copy per image (default)
+#   vector -> keep only the geometry (Findings JSON); the app draws an overlay,
+#             raster copies are produced later by export_annotated_images()
+ANNOTATE_RASTER = "raster"
+ANNOTATE_VECTOR = "vector"
+
+# In-process inference is serialized: the shared model objects are not thread-safe
+_inference_lock = threading.Lock()
+
+# Cross-session findings database, opened on first use
+FINDINGS_DB = BASE_DIR / "sessions" / "findings.db"
+_findings_store = None
+_findings_lock = threading.Lock()
+
+
+def get_findings_store():
+    global _findings_store
+    with _findings_lock:
+        if _findings_store is None:
+            FINDINGS_DB.parent.mkdir(parents=True, exist_ok=True)
+            _findings_store = FindingsStore(FINDINGS_DB)
+    return _findings_store
+
+
+def use_findings_db(db_path):
+    """Keep findings in db_path (e.g. next to a custom sessions root) from now on."""
+    global FINDINGS_DB, _findings_store
+    with _findings_lock:
+        db_path = Path(db_path)
+        if _findings_store is not None and db_path != FINDINGS_DB:
+            _findings_store.close()
+            _findings_store = None
+        FINDINGS_DB = db_path
+
+
+def tune_in_process():
+    """
+    In-process inference is serialized, so the knob worth tuning is torch's
+    intra-op thread count. Callers using a process pool tune their worker
+    count with governor.tune() instead.
+    """
+    if governor.torch_threads is not None:
+        governor.tune(governor.set_torch_threads, 1, governor.budget, governor.budget, "torch threads")
+    else:
+        governor.untune()
+
+
+
+# Ultralytics letterboxes inputs to imgsz anyway; decode no larger than this
+DEFAULT_IMGSZ = 640
+
+
+def inference_side(run_models: dict, predict_args=None):
+    """Longest side the given models need (imgsz in predict_args, their override, else the default)."""
+    side = 0
+    for m in run_models.values():
+        imgsz = (predict_args or {}).get("imgsz") or getattr(m, "overrides", {}).get("imgsz") or DEFAULT_IMGSZ
+        side = max(side, max(imgsz) if isinstance(imgsz, (list, tuple)) else int(imgsz))
+    return side or DEFAULT_IMGSZ
 
 
 # -------------------------------------------------------------
 #  Create new session folder: sessions/YYYY-MM-DD_HH-MM-SS/
 # -------------------------------------------------------------
-def create_session_folder():
+def create_session_folder(root=None):
+    """root: parent folder for sessions (default BASE_DIR/sessions), e.g. a network share."""
     now = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    session = BASE_DIR / "sessions" / now
+    parent = Path(root if root is not None else BASE_DIR / "sessions")
+    parent.mkdir(parents=True, exist_ok=True)
+
+    # Sessions started in the same second (app, CLI, other PCs) each get their own folder
+    session, n = parent / now, 1
+    while True:
+        try:
+            session.mkdir()
+            break
+        except FileExistsError:
+            n += 1
+            session = parent / f"{now}_{n}"
 
     # Create subfolders
     (session / "uploads").mkdir(parents=True, exist_ok=True)
@@ -36,23 +149,44 @@ def create_session_folder():
 
 
 # -------------------------------------------------------------
-# Save Excel results inside the session folder
+#  Re-open an existing session: images not yet persisted per journal
 # -------------------------------------------------------------
-def save_to_excel(session_results_dir: Path, actual_image_path: str, annotated_image_path: str,
-                  detections: list, comments: list):
-    """
-    Save one row per inference to results.xlsx inside session_results_dir.
+def resume_session(session_folder):
+    session = Path(session_folder)
+    if not (session / "uploads").is_dir():
+        raise FileNotFoundError(f"Not a session folder: {session}")
+    (session / "results").mkdir(parents=True, exist_ok=True)
+    # Rows a streaming run logged before it stopped
+    finalize_results(session / "results")
 
-    Columns:
-    - Timestamp
-    - Actual Image Path
-    - Actual Image Name
-    - Annotated Image Path
-    - Annotated Image Name
-    - Findings (JSON string of detections)
-    - Comments (semi-colon separated)
-    """
-    excel_path = session_results_dir / "results.xlsx"
+    pending = unfinished_images(session)
+
+    print("\n===============================")
+    print(" RESUMED SESSION:", session)
+    print(" UNFINISHED IMAGES:", len(pending))
+    print("===============================\n")
+
+    return session, pending
+
+
+# -------------------------------------------------------------
+# Save Excel results inside the session folder
+# -------------------------------------------------------------
+RESULTS_HEADER = [
+    "Timestamp",
+    "Actual Image Path",
+    "Actual Image Name",
+    "Annotated Image Path",
+    "Annotated Image Name",
+    "Findings (JSON)",
+    "Comments",
+    "Duplicate Of"
+]
+
+
+def excel_row(actual_image_path: str, annotated_image_path: str, detections: list, comments: list,
+              duplicate_of: str = None):
+    """One results.xlsx row, in RESULTS_HEADER order."""
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # Prepare data
@@ -70,6 +204,15 @@ def save_to_excel(session_results_dir: Path, actual_image_path: str, annotated_i
 
     comments_text = "; ".join(comments) if comments else ""
 
+    return [now, actual_image_path, actual_image_name, annotated_image_path,
+            annotated_image_name, findings_json, comments_text,
+            str(duplicate_of) if duplicate_of else ""]
+
+
+def append_to_excel(session_results_dir: Path, rows: list):
+    """Append rows to results.xlsx with a single load and save of the workbook."""
+    excel_path = Path(session_results_dir) / "results.xlsx"
+
     # Create or append workbook
     if excel_path.exists():
         wb = load_workbook(excel_path)
@@ -78,107 +221,272 @@ def save_to_excel(session_results_dir: Path, actual_image_path: str, annotated_i
         wb = Workbook()
         ws = wb.active
         ws.title = "Results"
-        ws.append([
-            "Timestamp",
-            "Actual Image Path",
-            "Actual Image Name",
-            "Annotated Image Path",
-            "Annotated Image Name",
-            "Findings (JSON)",
-            "Comments"
-        ])
-
-    ws.append([now, actual_image_path, actual_image_name, annotated_image_path,
-               annotated_image_name, findings_json, comments_text])
+        ws.append(RESULTS_HEADER)
+
+    for row in rows:
+        ws.append(row)
     wb.save(excel_path)
 
     print("EXCEL SAVED:", excel_path)
 
 
+def save_to_excel(session_results_dir: Path, actual_image_path: str, annotated_image_path: str,
+                  detections: list, comments: list, duplicate_of: str = None):
+    """
+    Save one row per inference to results.xlsx inside session_results_dir.
+
+    Columns:
+    - Timestamp
+    - Actual Image Path
+    - Actual Image Name
+    - Annotated Image Path
+    - Annotated Image Name
+    - Findings (JSON string of detections)
+    - Comments (semi-colon separated)
+    - Duplicate Of (image whose detections were reused, empty otherwise)
+    """
+    append_to_excel(session_results_dir, [excel_row(actual_image_path, annotated_image_path,
+                                                    detections, comments, duplicate_of)])
+
+
 # -------------------------------------------------------------
-# Main function: run YOLO models on image and produce results
-# Accepts optional enabled_models dict (name -> model_object)
-# If enabled_models is None, uses the global 'models'
+# Streaming sessions: rows go to an append-only log next to the
+# workbook (no per-image load/save of a growing results.xlsx) and
+# are folded into results.xlsx once, when the session ends
 # -------------------------------------------------------------
-def run_inference_on_path(image_path: str, session_results_dir: Path, enabled_models: dict = None):
-    image_path = str(image_path).replace("\\", "/")
-    print("\nINPUT IMAGE:", image_path)
+RESULTS_LOG = "results.jsonl"
+
+
+def append_results_log(session_results_dir: Path, row: list):
+    with open(Path(session_results_dir) / RESULTS_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def finalize_results(session_results_dir: Path):
+    """
+    Fold the streaming log into results.xlsx in one write-only pass, after any
+    rows the workbook already has. Returns the number of rows folded in.
+    """
+    session_results_dir = Path(session_results_dir)
+    log_path = session_results_dir / RESULTS_LOG
+    if not log_path.exists():
+        return 0
+
+    excel_path = session_results_dir / "results.xlsx"
+    tmp_path = session_results_dir / "results.xlsx.tmp"
+    out = Workbook(write_only=True)
+    ws = out.create_sheet("Results")
+    ws.append(RESULTS_HEADER)
+
+    # Rows saved before streaming started (e.g. a resumed session)
+    if excel_path.exists():
+        existing = load_workbook(excel_path, read_only=True)
+        try:
+            for row in existing.active.iter_rows(min_row=2, values_only=True):
+                ws.append(list(row))
+        finally:
+            existing.close()
+
+    count = 0
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                ws.append(json.loads(line))
+                count += 1
+            except ValueError:
+                print("RESULTS LOG: skipping torn line in", log_path)
+
+    out.save(tmp_path)
+    os.replace(tmp_path, excel_path)
+    log_path.unlink()
+    print(f"EXCEL BUILT: {excel_path} (+{count} rows)")
+    return count
+
+
+# -------------------------------------------------------------
+# Persist one image's results: session workbook + findings store
+# -------------------------------------------------------------
+def save_results(session_results_dir: Path, image_path: str, annotated_path: str,
+                 detections: list, comments: list, duplicate_of: str = None, stream=False):
+    # The store row is written even if the workbook can't be (e.g. open in Excel);
+    # the Excel error still propagates so the image stays unfinished in the journal.
+    # Resume then saves it again; add_image replaces the earlier store row.
+    try:
+        with telemetry.span("persist_excel"):
+            if stream:
+                append_results_log(session_results_dir, excel_row(image_path, annotated_path, detections,
+                                                                  comments, duplicate_of))
+            else:
+                save_to_excel(session_results_dir, image_path, annotated_path, detections, comments,
+                              duplicate_of=duplicate_of)
+    finally:
+        try:
+            with telemetry.span("persist_store"):
+                get_findings_store().add_image(Path(session_results_dir).parent.name, image_path,
+                                               detections, comments, annotated_path=annotated_path,
+                                               duplicate_of=duplicate_of)
+        except Exception as e:
+            print("FINDINGS STORE ERROR:", e)
+
+
+# -------------------------------------------------------------
+# Annotation step shared by fresh inference and duplicate reuse.
+# Returns the path the GUI should display.
+# -------------------------------------------------------------
+def annotate_image(image_path: str, detections: list, session_results_dir: Path, annotate=ANNOTATE_RASTER):
+    if annotate == ANNOTATE_VECTOR:
+        # Geometry is persisted in the Findings JSON; display the original
+        return image_path, ""
+
+    out_name = f"annotated_{Path(image_path).name}"
+    out_path_str = str(session_results_dir / out_name).replace("\\", "/")
+
+    print("OUTPUT FILE PATH:", out_path_str)
+
+    try:
+        with telemetry.span("draw"):
+            draw_boxes(image_path, detections, out_path_str)
+        print("ANNOTATION SAVED:", out_path_str)
+    except Exception as e:
+        print("DRAW ERROR:", e)
+
+    return out_path_str, out_path_str
 
-    # Choose which models to run
-    run_models = enabled_models if (enabled_models is not None and len(enabled_models) > 0) else models
 
+# -------------------------------------------------------------
+# Compute part of one image: decode -> predict -> comments -> annotate.
+# Nothing is persisted here, so it can also run in a worker process.
+# decoded: optional (image, (scale_x, scale_y)) already decoded by the caller
+# predict_args: optional keyword arguments for every model's predict()
+#               (e.g. conf, imgsz); Ultralytics' own defaults apply otherwise
+# Returns (display_path, annotated_path, detections, comments)
+# -------------------------------------------------------------
+def analyze_image(image_path: str, session_results_dir: Path, run_models: dict, decoded=None,
+                  journal=None, checkpoint=None, annotate=ANNOTATE_RASTER, predict_args=None):
     all_detections = []
 
+    # ------------ Decode once, at reduced resolution ------------- #
+    # Boxes are scaled back to full-resolution coordinates below
+    if decoded is not None:
+        source, (sx, sy) = decoded
+    else:
+        try:
+            with telemetry.span("decode"):
+                source, (sx, sy), stats = decode_image(image_path, min_side=inference_side(run_models, predict_args))
+            telemetry.gauge("decoded_mb", stats["peak_bytes"] / 1e6)
+            print("DECODE:", format_stats(stats))
+        except Exception as e:
+            print("DECODE ERROR (model will read the file):", e)
+            source, sx, sy = image_path, 1.0, 1.0
+
     # ------------ Run each available model ------------- #
     for model_name, model_obj in run_models.items():
+        if checkpoint is not None:
+            checkpoint()
         print(f"\nRunning model '{model_name}' on image...")
 
         # Execute prediction (Ultralytics v11 -> Results objects)
         try:
-            results = model_obj.predict(image_path)  # returns Results object(s)
+            with telemetry.span(f"predict:{model_name}"):
+                results = model_obj.predict(source, **(predict_args or {}))  # returns Results object(s)
         except Exception as e:
             print(f"ERROR running model '{model_name}':", e)
             results = []
 
         parsed_dets = []
-
-        # Parse Ultralytics Results -> list of detection dicts
-        for r in results:
-            # r.boxes might be None or empty
-            boxes = getattr(r, "boxes", None)
-            names = getattr(r, "names", {})  # mapping id->name
-            if boxes is None:
-                continue
-
-            # Each box in r.boxes is a Box object with attributes xyxy, conf, cls
-            for b in boxes:
-                try:
-                    # xyxy, conf, cls are tensors, access [0] then convert
-                    xyxy_tensor = b.xyxy[0]  # tensor-like
-                    xyxy = [int(round(float(x))) for x in xyxy_tensor.tolist()]
-
-                    conf_val = float(b.conf[0]) if getattr(b, "conf", None) is not None else 0.0
-                    cls_id = int(b.cls[0]) if getattr(b, "cls", None) is not None else -1
-
-                    label = names.get(cls_id, str(cls_id)) if isinstance(names, dict) else str(cls_id)
-
-                    parsed_dets.append({
-                        "bbox": xyxy,           # [x1, y1, x2, y2] ints
-                        "confidence": conf_val, # float
-                        "label": label,         # string
-                        "model": model_name
-                    })
-                except Exception as e:
-                    print("Box parsing error (skipping one box):", e)
+        with telemetry.span("parse"):
+            # Parse Ultralytics Results -> list of detection dicts
+            for r in results:
+                # r.boxes might be None or empty
+                boxes = getattr(r, "boxes", None)
+                names = getattr(r, "names", {})  # mapping id->name
+                if boxes is None:
                     continue
 
+                # Each box in r.boxes is a Box object with attributes xyxy, conf, cls
+                for b in boxes:
+                    try:
+                        # xyxy, conf, cls are tensors, access [0] then convert
+                        xyxy_tensor = b.xyxy[0]  # tensor-like
+                        x1, y1, x2, y2 = (float(x) for x in xyxy_tensor.tolist())
+                        xyxy = [int(round(x1 * sx)), int(round(y1 * sy)),
+                                int(round(x2 * sx)), int(round(y2 * sy))]
+
+                        conf_val = float(b.conf[0]) if getattr(b, "conf", None) is not None else 0.0
+                        cls_id = int(b.cls[0]) if getattr(b, "cls", None) is not None else -1
+
+                        label = names.get(cls_id, str(cls_id)) if isinstance(names, dict) else str(cls_id)
+
+                        parsed_dets.append({
+                            "bbox": xyxy,           # [x1, y1, x2, y2] ints
+                            "confidence": conf_val, # float
+                            "label": label,         # string
+                            "model": model_name
+                        })
+                    except Exception as e:
+                        print("Box parsing error (skipping one box):", e)
+                        continue
+
         print(f"Model '{model_name}' detections:", len(parsed_dets))
         all_detections.extend(parsed_dets)
 
+    telemetry.count("images")
+    telemetry.count("detections", len(all_detections))
+
+    if journal is not None:
+        journal.mark(image_path, INFERRED)
+
     # ------------ Generate comments ------------ #
     try:
-        comments = generate_comments(all_detections)
+        with telemetry.span("comment"):
+            comments = generate_comments(all_detections)
     except Exception as e:
         print("COMMENT GENERATION ERROR:", e)
         comments = ["Error generating comments"]
 
     # ------------ Save annotated image ------------ #
-    out_name = f"annotated_{Path(image_path).name}"
-    out_path = session_results_dir / out_name
-    out_path_str = str(out_path).replace("\\", "/")
+    if checkpoint is not None:
+        checkpoint()
 
-    print("OUTPUT FILE PATH:", out_path_str)
+    out_path_str, annotated_path = annotate_image(image_path, all_detections, session_results_dir, annotate)
 
-    try:
-        draw_boxes(image_path, all_detections, out_path_str)
-        print("ANNOTATION SAVED:", out_path_str)
-    except Exception as e:
-        print("DRAW ERROR:", e)
+    if journal is not None:
+        journal.mark(image_path, ANNOTATED)
+
+    return out_path_str, annotated_path, all_detections, comments
+
+
+# -------------------------------------------------------------
+# Main function: run YOLO models on image and produce results
+# Accepts optional enabled_models dict (name -> model_object)
+# If enabled_models is None, uses the global 'models'
+# Optional journal (utils.journal.SessionJournal) records each stage
+# Optional checkpoint() is called between stages; it may raise to cancel
+# annotate: ANNOTATE_RASTER or ANNOTATE_VECTOR (see above)
+# stream: append the Excel row to RESULTS_LOG (see finalize_results)
+# -------------------------------------------------------------
+def run_inference_on_path(image_path: str, session_results_dir: Path, enabled_models: dict = None,
+                          journal=None, checkpoint=None, annotate=ANNOTATE_RASTER, stream=False):
+    image_path = str(image_path).replace("\\", "/")
+    print("\nINPUT IMAGE:", image_path)
+
+    # Choose which models to run
+    run_models = enabled_models if (enabled_models is not None and len(enabled_models) > 0) else get_models()
+
+    out_path_str, annotated_path, all_detections, comments = analyze_image(
+        image_path, session_results_dir, run_models, journal=journal, checkpoint=checkpoint, annotate=annotate
+    )
 
     # ------------ Save Excel ------------ #
         # ------------ Save Excel (NEW call signature) ------------ #
+    if checkpoint is not None:
+        checkpoint()
+
     try:
-        save_to_excel(session_results_dir, image_path, out_path_str, all_detections, comments)
+        save_results(session_results_dir, image_path, annotated_path, all_detections, comments,
+                     stream=stream)
+        if journal is not None:
+            journal.mark(image_path, PERSISTED)
     except Exception as e:
         print("EXCEL SAVE ERROR:", e)
 
@@ -186,6 +494,266 @@ def run_inference_on_path(image_path: str, session_results_dir: Path, enabled_mo
     return out_path_str, all_detections, comments
 
 
+# -------------------------------------------------------------
+# Near-duplicate reuse: copy the representative image's results
+# onto a duplicate without running the models again
+# -------------------------------------------------------------
+def reuse_inference_result(image_path: str, session_results_dir: Path, source_path: str,
+                           detections: list, comments: list, journal=None, annotate=ANNOTATE_RASTER,
+                           stream=False):
+    image_path = str(image_path).replace("\\", "/")
+    print("\nDUPLICATE IMAGE:", image_path, "-> reusing results of", source_path)
+
+    out_path_str, annotated_path = annotate_image(image_path, detections, session_results_dir, annotate)
+
+    if journal is not None:
+        journal.mark(image_path, ANNOTATED)
+
+    try:
+        save_results(session_results_dir, image_path, annotated_path, detections, comments,
+                     duplicate_of=source_path, stream=stream)
+        if journal is not None:
+            journal.mark(image_path, PERSISTED)
+    except Exception as e:
+        print("EXCEL SAVE ERROR:", e)
+
+    return out_path_str, detections, comments
+
+
+# -------------------------------------------------------------
+# Session-level processing used by the scheduler: one call per image,
+# with near-duplicate reuse and journaling driven by the session context
+# -------------------------------------------------------------
+def new_session_context(session_folder: Path, files: list, enabled_models: dict = None,
+                        journal=None, skip_duplicates=False, annotate=ANNOTATE_RASTER, pool=None,
+                        stream=False):
+    return {
+        "session_folder": Path(session_folder),
+        "results_dir": Path(session_folder) / "results",
+        "files": list(files),
+        "models": enabled_models,
+        "journal": journal,
+        "skip_duplicates": skip_duplicates,
+        "annotate": annotate,
+        "stream": stream,       # rows to RESULTS_LOG; finalize_results() builds the workbook at the end
+        "pool": pool,           # process_pool.InferencePool, or None for in-process inference
+        # Near-duplicates are found as images arrive: each is hashed by its own
+        # worker and matched against the representatives seen so far
+        "hash_index": BKTree(),  # representative hashes
+        "duplicates": {},       # duplicate path -> representative path
+        "rep_sizes": {},        # representative path -> upright (width, height)
+        "rep_results": {},      # representative path -> (detections, comments)
+        "rep_done": {},         # representative path -> Event, set once it finished (or failed)
+        "lock": threading.Lock(),
+        "persist_lock": threading.Lock(),  # one writer per session workbook
+    }
+
+
+def process_session_image(image_path: str, ctx: dict, checkpoint=None):
+    telemetry.bind_session(ctx["session_folder"])
+    source, size = _match_duplicate(image_path, ctx)
+    is_rep = source is None and image_path in ctx["rep_done"]
+
+    if source is not None:
+        reused = _wait_for_representative(source, ctx, checkpoint)
+        if reused is not None:
+            dets, comments = reused
+            dets = scale_detections(dets, ctx["rep_sizes"][source], size)
+            telemetry.count("duplicate_reuse")
+            with ctx["persist_lock"]:
+                return reuse_inference_result(image_path, ctx["results_dir"], source, dets, comments,
+                                              journal=ctx["journal"], annotate=ctx["annotate"],
+                                              stream=ctx["stream"])
+
+    try:
+        if ctx["pool"] is not None:
+            out, dets, comments = _process_in_pool(image_path, ctx, checkpoint)
+        else:
+            with _inference_lock, ctx["persist_lock"]:
+                out, dets, comments = run_inference_on_path(image_path, ctx["results_dir"], ctx["models"],
+                                                            journal=ctx["journal"], checkpoint=checkpoint,
+                                                            annotate=ctx["annotate"], stream=ctx["stream"])
+        if is_rep:
+            with ctx["lock"]:
+                ctx["rep_results"][image_path] = (dets, comments)
+    finally:
+        if is_rep:
+            # Wake duplicates waiting on this image, with or without a result
+            ctx["rep_done"][image_path].set()
+    governor.record()
+    if telemetry.enabled():
+        telemetry.gauge("rss_mb", telemetry.rss_mb())
+    return out, dets, comments
+
+
+def _match_duplicate(image_path: str, ctx: dict):
+    """
+    (representative path, upright size) if image_path near-duplicates an
+    image already picked up in this session, else (None, size) - and the
+    image becomes a representative itself. Hashing runs outside the session
+    lock, so workers never wait on each other's hashing.
+    """
+    if not ctx["skip_duplicates"]:
+        return None, None
+    try:
+        h, size = dhash(image_path), upright_size(image_path)
+    except Exception as e:
+        print("HASH ERROR (image kept):", image_path, e)
+        return None, None
+
+    with ctx["lock"]:
+        matches = ctx["hash_index"].find(h, DUPLICATE_DISTANCE)
+        if matches:
+            source = min(matches)[1]
+            ctx["duplicates"][image_path] = source
+            return source, size
+        # Only representatives go into the index so chains can't drift
+        ctx["hash_index"].add(h, image_path)
+        ctx["rep_sizes"][image_path] = size
+        ctx["rep_done"][image_path] = threading.Event()
+    return None, size
+
+
+def scale_detections(detections: list, from_size, to_size):
+    """Detections of an image of from_size mapped onto a near-duplicate of to_size."""
+    if from_size == to_size or not from_size or not to_size:
+        return detections
+    sx, sy = to_size[0] / from_size[0], to_size[1] / from_size[1]
+    scaled = []
+    for d in detections:
+        x1, y1, x2, y2 = d["bbox"]
+        scaled.append(dict(d, bbox=[int(round(x1 * sx)), int(round(y1 * sy)),
+                                    int(round(x2 * sx)), int(round(y2 * sy))]))
+    return scaled
+
+
+def _wait_for_representative(source: str, ctx: dict, checkpoint=None):
+    """
+    (detections, comments) of a duplicate's representative, or None to run
+    full inference. A representative is registered by the worker running it,
+    so with several workers the duplicate waits for that result rather than
+    repeating the inference.
+    """
+    done = ctx["rep_done"][source]
+    while not done.wait(0.25):
+        if checkpoint is not None:
+            checkpoint()
+    with ctx["lock"]:
+        return ctx["rep_results"].get(source)
+
+
+def _process_in_pool(image_path: str, ctx: dict, checkpoint=None):
+    image_path = str(image_path).replace("\\", "/")
+    print("\nINPUT IMAGE (pool):", image_path)
+    run_models = ctx["models"] if ctx["models"] else get_models()
+
+    if checkpoint is not None:
+        checkpoint()
+    # Decode is timed here, the worker's stage spans are merged back by the pool;
+    # pool_analyze is the whole round trip including queueing and transfer
+    with telemetry.span("pool_analyze"):
+        out_path_str, annotated_path, all_detections, comments = ctx["pool"].analyze(
+            image_path, ctx["results_dir"], run_models, ctx["annotate"], inference_side(run_models)
+        )
+    telemetry.count("images")
+    telemetry.count("detections", len(all_detections))
+
+    journal = ctx["journal"]
+    if journal is not None:
+        journal.mark(image_path, INFERRED)
+        journal.mark(image_path, ANNOTATED)
+
+    if checkpoint is not None:
+        checkpoint()
+    with ctx["persist_lock"]:
+        try:
+            save_results(ctx["results_dir"], image_path, annotated_path, all_detections, comments,
+                         stream=ctx["stream"])
+            if journal is not None:
+                journal.mark(image_path, PERSISTED)
+        except Exception as e:
+            print("EXCEL SAVE ERROR:", e)
+
+    return out_path_str, all_detections, comments
+
+
+# -------------------------------------------------------------
+# Bake raster annotations on demand for a vector-mode session.
+# Reads geometry back from results.xlsx and fills in the
+# Annotated Image Path/Name columns for rows that had none.
+# -------------------------------------------------------------
+def export_annotated_images(session_results_dir: Path):
+    finalize_results(session_results_dir)
+    excel_path = Path(session_results_dir) / "results.xlsx"
+    if not excel_path.exists():
+        return 0
+
+    wb = load_workbook(excel_path)
+    ws = wb.active
+    exported = []
+
+    # Columns: Timestamp, Actual Path, Actual Name, Annotated Path, Annotated Name, Findings, ...
+    for row in ws.iter_rows(min_row=2):
+        actual_path, annotated_cell, annotated_name_cell, findings = row[1].value, row[3], row[4], row[5].value
+        if annotated_cell.value or not actual_path:
+            continue
+        try:
+            detections = json.loads(findings) if findings else []
+        except ValueError:
+            print("EXPORT: unreadable findings for", actual_path)
+            continue
+
+        out_name = f"annotated_{Path(actual_path).name}"
+        out_path_str = str(Path(session_results_dir) / out_name).replace("\\", "/")
+        try:
+            draw_boxes(actual_path, detections, out_path_str)
+        except Exception as e:
+            print("DRAW ERROR:", e)
+            continue
+        if not os.path.exists(out_path_str):
+            continue
+
+        annotated_cell.value = out_path_str
+        annotated_name_cell.value = out_name
+        exported.append((actual_path, out_path_str))
+
+    if exported:
+        wb.save(excel_path)
+        # Search hits should open the new raster copies too
+        try:
+            store = get_findings_store()
+            session = Path(session_results_dir).parent.name
+            for actual_path, out_path_str in exported:
+                store.set_annotated_path(session, actual_path, out_path_str)
+        except Exception as e:
+            print("FINDINGS STORE ERROR:", e)
+    print(f"EXPORTED {len(exported)} annotated images to", session_results_dir)
+    return len(exported)
+
+
+# -------------------------------------------------------------
+# Read results.xlsx back (path or file object, e.g. from a packed session)
+# -------------------------------------------------------------
+def read_results(excel_source):
+    """Rows of results.xlsx as (actual path, annotated path, detections, comments)."""
+    wb = load_workbook(excel_source, read_only=True)
+    rows = []
+    try:
+        for row in wb.active.iter_rows(min_row=2, values_only=True):
+            actual_path, annotated_path, findings, comments = row[1], row[3], row[5], row[6]
+            if not actual_path:
+                continue
+            try:
+                detections = json.loads(findings) if findings else []
+            except ValueError:
+                detections = []
+            rows.append((actual_path, annotated_path or "", detections,
+                         [c for c in (comments or "").split("; ") if c]))
+    finally:
+        wb.close()
+    return rows
+
+
 # -------------------------------------------------------------
 # Basic folder structure creation
 # -------------------------------------------------------------
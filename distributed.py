@@ -0,0 +1,349 @@
+# distributed.py
+"""
+Multi-machine batch processing over a shared folder.
+
+A coordinator copies a batch into a session folder on a network share and
+splits it into jobs. Worker nodes (any PC with the models) claim jobs as
+time-limited leases, keep them alive with heartbeats, and write results
+back next to the job. Leases whose heartbeat stops are returned to the
+pending pool. The coordinator merges finished jobs into the session's
+single results.xlsx and the findings store, so the session looks exactly
+like one produced by the desktop app.
+
+Queue layout, inside the session folder:
+
+    queue/batch.json            batch settings (lease length, models, annotation mode)
+    queue/pending/<job>.json    unclaimed jobs: {"job_id", "files": [paths relative to the session]}
+    queue/leased/<job>.json     claimed jobs; file mtime is the last heartbeat
+    queue/done/<job>.json       finished jobs
+    queue/results/<job>.jsonl   one line per image, written by the worker
+    queue/merged.txt            job ids already merged by the coordinator
+
+Claiming is an atomic rename from pending/ to leased/, which works on a
+shared SMB/NFS directory; any other store (SQLite, HTTP) only needs to
+provide the same DirectoryLeaseStore methods.
+
+Usage:
+    python distributed.py coordinator --share //server/audits img1.jpg img2.jpg ...
+    python distributed.py worker --session //server/audits/2026-01-01_10-00-00
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from pathlib import Path
+
+QUEUE_DIR = "queue"
+
+
+class DirectoryLeaseStore:
+    def __init__(self, session_folder):
+        self.session_folder = Path(session_folder)
+        self.root = self.session_folder / QUEUE_DIR
+        self.pending = self.root / "pending"
+        self.leased = self.root / "leased"
+        self.done = self.root / "done"
+        self.results = self.root / "results"
+
+    # ------------------------------------------------------------
+    # Coordinator side
+    # ------------------------------------------------------------
+    def create_batch(self, rel_files, chunk_size=25, lease_seconds=120, models=None, annotate="raster"):
+        for d in (self.pending, self.leased, self.done, self.results):
+            d.mkdir(parents=True, exist_ok=True)
+
+        settings = {"lease_seconds": lease_seconds, "models": models, "annotate": annotate,
+                    "created": time.time()}
+        (self.root / "batch.json").write_text(json.dumps(settings), encoding="utf-8")
+
+        job_ids = []
+        for n, start in enumerate(range(0, len(rel_files), chunk_size)):
+            job_id = f"job-{n:06d}"
+            job = {"job_id": job_id, "files": rel_files[start:start + chunk_size]}
+            self._write_atomic(self.pending / f"{job_id}.json", json.dumps(job))
+            job_ids.append(job_id)
+        return job_ids
+
+    def settings(self):
+        return json.loads((self.root / "batch.json").read_text(encoding="utf-8"))
+
+    def reclaim_expired(self):
+        """Move leases without a recent heartbeat back to pending. Returns the reclaimed job ids."""
+        lease_seconds = self.settings()["lease_seconds"]
+        now = time.time()
+        reclaimed = []
+        for f in self.leased.glob("*.json"):
+            try:
+                if now - f.stat().st_mtime > lease_seconds:
+                    os.rename(f, self.pending / f.name)
+                    reclaimed.append(f.stem)
+            except OSError:
+                continue  # completed or reclaimed by someone else meanwhile
+        return reclaimed
+
+    def counts(self):
+        return {
+            "pending": sum(1 for _ in self.pending.glob("*.json")),
+            "leased": sum(1 for _ in self.leased.glob("*.json")),
+            "done": sum(1 for _ in self.done.glob("*.json")),
+        }
+
+    def finished_jobs(self):
+        return sorted(f.stem for f in self.done.glob("*.json"))
+
+    def job_results(self, job_id):
+        path = self.results / f"{job_id}.jsonl"
+        if not path.exists():
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def merged_jobs(self):
+        path = self.root / "merged.txt"
+        if not path.exists():
+            return set()
+        return set(path.read_text(encoding="utf-8").split())
+
+    def mark_merged(self, job_id):
+        with open(self.root / "merged.txt", "a", encoding="utf-8") as f:
+            f.write(job_id + "\n")
+
+    # ------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------
+    def claim(self):
+        """Lease one pending job. Returns the job dict or None when nothing is pending."""
+        for f in sorted(self.pending.glob("*.json")):
+            target = self.leased / f.name
+            try:
+                # Touch first: rename keeps the mtime, and an old mtime in
+                # leased/ would look like an expired lease
+                os.utime(f)
+                os.rename(f, target)  # atomic: exactly one node wins
+            except OSError:
+                continue
+            return json.loads(target.read_text(encoding="utf-8"))
+        return None
+
+    def heartbeat(self, job_id):
+        """Extend a lease. Returns False if the lease was lost (expired and reclaimed)."""
+        try:
+            os.utime(self.leased / f"{job_id}.json")
+            return True
+        except OSError:
+            return False
+
+    def complete(self, job_id, results):
+        # Results first, then the done marker, so a done job always has results.
+        # A job re-run after losing its lease simply rewrites the same file.
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+        self._write_atomic(self.results / f"{job_id}.jsonl", lines)
+        try:
+            os.rename(self.leased / f"{job_id}.json", self.done / f"{job_id}.json")
+        except OSError:
+            # Lease was reclaimed while we worked; record completion anyway,
+            # the pending copy will be dropped by whoever claims it next
+            job = {"job_id": job_id}
+            self._write_atomic(self.done / f"{job_id}.json", json.dumps(job))
+
+    def is_done(self, job_id):
+        return (self.done / f"{job_id}.json").exists()
+
+    @staticmethod
+    def _write_atomic(path, text):
+        tmp = path.with_name(path.name + f".{socket.gethostname()}.{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+class Heartbeat:
+    """Background thread that keeps a lease alive while a job is processed."""
+
+    def __init__(self, store, job_id, interval):
+        self.store = store
+        self.job_id = job_id
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.store.heartbeat(self.job_id):
+                self.lost = True
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# ------------------------------------------------------------
+# Coordinator
+# ------------------------------------------------------------
+def submit_batch(files, share, chunk_size=25, lease_seconds=120, models=None, annotate="raster"):
+    from detection_core import create_session_folder
+
+    session = create_session_folder(root=share)
+    rel_files = []
+    for f in files:
+        dest = session / "uploads" / Path(f).name
+        try:
+            shutil.copy(f, dest)
+            rel_files.append(dest.relative_to(session).as_posix())
+        except Exception as e:
+            print("Error copying:", e)
+
+    store = DirectoryLeaseStore(session)
+    jobs = store.create_batch(rel_files, chunk_size=chunk_size, lease_seconds=lease_seconds,
+                              models=models, annotate=annotate)
+    print(f"[coordinator] {len(rel_files)} images in {len(jobs)} jobs at {session}")
+    return session, len(jobs)
+
+
+def merge_finished(store, journal=None):
+    """
+    Merge newly finished jobs into the session's results.xlsx and findings store.
+
+    Each job's rows go into the workbook with one load/save. A job whose
+    workbook write fails (e.g. results.xlsx open in Excel) stays unmerged
+    and is retried on the next poll; the other jobs still merge.
+    """
+    from detection_core import append_to_excel, excel_row, get_findings_store
+    from utils.journal import PERSISTED
+
+    results_dir = store.session_folder / "results"
+    session = store.session_folder.name
+    merged = store.merged_jobs()
+    count = 0
+    for job_id in store.finished_jobs():
+        if job_id in merged:
+            continue
+        try:
+            records = []
+            for r in store.job_results(job_id):
+                image_path = (store.session_folder / r["image"]).as_posix()
+                annotated = (store.session_folder / r["annotated"]).as_posix() if r["annotated"] else ""
+                records.append((image_path, annotated, r["detections"], r["comments"]))
+            append_to_excel(results_dir, [excel_row(*rec) for rec in records])
+        except Exception as e:
+            print(f"[coordinator] Merge of {job_id} failed, will retry:", e)
+            continue
+
+        findings = get_findings_store()
+        for image_path, annotated, detections, comments in records:
+            try:
+                findings.add_image(session, image_path, detections, comments, annotated_path=annotated)
+            except Exception as e:
+                print("FINDINGS STORE ERROR:", e)
+            if journal is not None:
+                journal.mark(image_path, PERSISTED)
+        store.mark_merged(job_id)
+        count += 1
+    return count
+
+
+def run_coordinator(store, total_jobs, poll=5.0):
+    from utils.journal import SessionJournal
+
+    journal = SessionJournal(store.session_folder)
+    try:
+        while True:
+            reclaimed = store.reclaim_expired()
+            if reclaimed:
+                print("[coordinator] Lease expired, re-queued:", ", ".join(reclaimed))
+            merged = merge_finished(store, journal)
+            c = store.counts()
+            print(f"[coordinator] pending={c['pending']} leased={c['leased']} done={c['done']}/{total_jobs}"
+                  + (f" (+{merged} merged)" if merged else ""))
+            if len(store.merged_jobs()) >= total_jobs:
+                break
+            time.sleep(poll)
+    finally:
+        journal.close()
+    print("[coordinator] All jobs merged into", store.session_folder / "results")
+
+
+# ------------------------------------------------------------
+# Worker node
+# ------------------------------------------------------------
+def run_worker(store, node_id=None, idle_exit=True, poll=5.0):
+    import detection_core as core
+
+    node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+    settings = store.settings()
+    run_models = core.get_models(settings.get("models")) or core.get_models()
+    results_dir = store.session_folder / "results"
+
+    while True:
+        job = store.claim()
+        if job is None:
+            # Any node may return dead leases to the pool, so work continues without the coordinator
+            store.reclaim_expired()
+            if idle_exit and not any(store.leased.glob("*.json")):
+                print(f"[worker {node_id}] No work left")
+                return
+            time.sleep(poll)
+            continue
+        if store.is_done(job["job_id"]):
+            # Re-queued copy of a job a slow node finished after all
+            os.remove(store.leased / f"{job['job_id']}.json")
+            continue
+
+        print(f"[worker {node_id}] Claimed {job['job_id']} ({len(job['files'])} images)")
+        results = []
+        with Heartbeat(store, job["job_id"], settings["lease_seconds"] / 3) as hb:
+            for rel in job["files"]:
+                image_path = (store.session_folder / rel).as_posix()
+                out, annotated, dets, comments = core.analyze_image(
+                    image_path, results_dir, run_models, annotate=settings.get("annotate", "raster")
+                )
+                results.append({
+                    "image": rel,
+                    "annotated": Path(annotated).relative_to(store.session_folder).as_posix() if annotated else "",
+                    "detections": dets,
+                    "comments": comments,
+                    "node": node_id,
+                })
+                if hb.lost:
+                    print(f"[worker {node_id}] Lease on {job['job_id']} expired; finishing anyway")
+        store.complete(job["job_id"], results)
+        print(f"[worker {node_id}] Completed {job['job_id']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed batch processing over a shared folder")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    c = sub.add_parser("coordinator", help="Create a batch on the share and merge results")
+    c.add_argument("files", nargs="+")
+    c.add_argument("--share", required=True, help="Shared folder that will hold the session")
+    c.add_argument("--chunk", type=int, default=25, help="Images per job lease")
+    c.add_argument("--lease", type=int, default=120, help="Lease length in seconds")
+    c.add_argument("--models", nargs="*", help="Model names to run (default: all)")
+    c.add_argument("--annotate", choices=["raster", "vector"], default="raster")
+
+    w = sub.add_parser("worker", help="Process jobs from a session on the share")
+    w.add_argument("--session", required=True, help="Session folder created by the coordinator")
+    w.add_argument("--node-id")
+    w.add_argument("--wait", action="store_true", help="Keep polling instead of exiting when idle")
+
+    args = parser.parse_args(argv)
+
+    if args.role == "coordinator":
+        session, total = submit_batch(args.files, args.share, chunk_size=args.chunk,
+                                      lease_seconds=args.lease, models=args.models, annotate=args.annotate)
+        run_coordinator(DirectoryLeaseStore(session), total)
+    else:
+        run_worker(DirectoryLeaseStore(args.session), node_id=args.node_id, idle_exit=not args.wait)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+# evaluate.py
+"""
+Offline accuracy evaluation against a labeled dataset (YOLO txt format).
+
+Runs the configured models through detection_core.analyze_image, the same
+path the app uses, and scores the detections against ground truth:
+precision/recall at the configuration's confidence threshold, plus mAP@0.5
+and mAP@0.5:0.95. Models predict at a near-zero threshold (MAP_CONF, as
+Ultralytics val does) so the mAP sees the whole PR curve. Latency, throughput
+and peak memory come from a second pass at the configuration's own conf, the
+threshold the app would run with. Several configurations (imgsz, confidence threshold,
+backend) can be evaluated in one go and are reported side by side, so tuning
+trade-offs are measurable.
+
+Dataset layout (Ultralytics convention):
+
+    <root>/data.yaml              names: [fire_extinguisher, obstacle, ...]
+    <root>/images/**/x.jpg
+    <root>/labels/**/x.txt        one "class cx cy w h" line per box, normalized
+
+Detections are matched to dataset classes by label name, so only the
+model whose classes the dataset uses needs to run (--models ppe).
+
+    python evaluate.py --data datasets/ppe --models ppe --imgsz 320 640 1280
+    python evaluate.py --data datasets/fire --configs eval_configs.yaml --workers 4 --out report.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import yaml
+from PIL import Image
+
+from inference.rules import normalize_label
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+DEFAULT_CONF = 0.25
+# Predict threshold for the mAP pass (as Ultralytics val): the PR curve needs the
+# low-confidence tail, the configuration's conf only cuts precision/recall
+MAP_CONF = 0.001
+
+
+# ------------------------------------------------------------
+# Dataset loading
+# ------------------------------------------------------------
+def load_class_names(root):
+    data_yaml = Path(root) / "data.yaml"
+    if not data_yaml.exists():
+        raise FileNotFoundError(f"{data_yaml} not found (needs a 'names' list)")
+    with open(data_yaml, "r", encoding="utf-8") as f:
+        names = (yaml.safe_load(f) or {}).get("names", [])
+    if isinstance(names, dict):
+        names = [names[k] for k in sorted(names)]
+    return [normalize_label(n) for n in names]
+
+
+def label_path(image_path):
+    """images/a/b.jpg -> labels/a/b.txt (last 'images' path component swapped)."""
+    parts = list(Path(image_path).parts)
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] == "images":
+            parts[i] = "labels"
+            break
+    return Path(*parts).with_suffix(".txt")
+
+
+def read_labels(path, width, height):
+    """YOLO txt -> (class ids (N,), pixel xyxy boxes (N, 4))."""
+    if not path.exists():
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+    rows = np.loadtxt(path, ndmin=2)
+    if rows.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4))
+    cx, cy = rows[:, 1] * width, rows[:, 2] * height
+    w, h = rows[:, 3] * width, rows[:, 4] * height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return rows[:, 0].astype(np.int64), boxes
+
+
+def load_dataset(root):
+    """[(image path, gt class ids, gt boxes)] for every image under <root>/images."""
+    image_root = Path(root) / "images"
+    if not image_root.is_dir():
+        image_root = Path(root)
+
+    samples = []
+    for p in sorted(image_root.rglob("*")):
+        if p.suffix.lower() not in IMAGE_EXTS:
+            continue
+        with Image.open(p) as img:  # header only
+            width, height = img.size
+        cls, boxes = read_labels(label_path(p), width, height)
+        samples.append((str(p).replace("\\", "/"), cls, boxes))
+    return samples
+
+
+# ------------------------------------------------------------
+# Matching and metrics (vectorized per image)
+# ------------------------------------------------------------
+def box_iou(a, b):
+    """IoU matrix (len(a), len(b)) for xyxy boxes."""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    iw = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    ih = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def match_predictions(pred_cls, pred_boxes, pred_conf, gt_cls, gt_boxes, iou_thresholds=IOU_THRESHOLDS):
+    """
+    True-positive matrix (n_pred, n_thresholds) for one image.
+
+    At each threshold every ground-truth box is matched at most once, to the
+    highest-confidence same-class prediction that overlaps it enough.
+    """
+    tp = np.zeros((len(pred_cls), len(iou_thresholds)), dtype=bool)
+    if len(pred_cls) == 0 or len(gt_cls) == 0:
+        return tp
+
+    order = np.argsort(-pred_conf, kind="stable")
+    iou = box_iou(pred_boxes[order], gt_boxes)
+    iou[pred_cls[order][:, None] != gt_cls[None, :]] = 0.0
+
+    for t, thr in enumerate(iou_thresholds):
+        taken = np.zeros(len(gt_cls), dtype=bool)
+        candidates = iou >= thr
+        for i in np.flatnonzero(candidates.any(axis=1)):
+            free = candidates[i] & ~taken
+            if free.any():
+                j = np.argmax(np.where(free, iou[i], -1.0))
+                taken[j] = True
+                tp[order[i], t] = True
+    return tp
+
+
+def average_precision(tp, conf, n_gt):
+    """AP per IoU threshold (COCO 101-point interpolation) for one class."""
+    if n_gt == 0 or len(conf) == 0:
+        return np.zeros(tp.shape[1])
+    order = np.argsort(-conf, kind="stable")
+    tpc = np.cumsum(tp[order], axis=0)
+    fpc = np.cumsum(~tp[order], axis=0)
+    recall = tpc / n_gt
+    precision = tpc / (tpc + fpc)
+
+    grid = np.linspace(0, 1, 101)
+    ap = np.zeros(tp.shape[1])
+    for t in range(tp.shape[1]):
+        # Precision envelope: best precision at any recall >= r
+        envelope = np.flip(np.maximum.accumulate(np.flip(precision[:, t])))
+        idx = np.searchsorted(recall[:, t], grid, side="left")
+        ap[t] = np.where(idx < len(envelope), envelope[np.minimum(idx, len(envelope) - 1)], 0.0).mean()
+    return ap
+
+
+def score(samples, predictions, names, conf_threshold=DEFAULT_CONF):
+    """
+    samples: output of load_dataset; predictions: image path -> detections.
+    Returns overall and per-class precision/recall/mAP.
+    """
+    class_index = {n: i for i, n in enumerate(names)}
+    all_tp, all_conf, all_cls = [], [], []
+    gt_counts = np.zeros(len(names), dtype=np.int64)
+
+    for path, gt_cls, gt_boxes in samples:
+        dets = [d for d in predictions.get(path, []) if normalize_label(d.get("label", "")) in class_index]
+        pred_cls = np.array([class_index[normalize_label(d["label"])] for d in dets], dtype=np.int64)
+        pred_boxes = np.array([d["bbox"] for d in dets], dtype=np.float64).reshape(-1, 4)
+        pred_conf = np.array([float(d.get("confidence", 0.0)) for d in dets])
+
+        all_tp.append(match_predictions(pred_cls, pred_boxes, pred_conf, gt_cls, gt_boxes))
+        all_conf.append(pred_conf)
+        all_cls.append(pred_cls)
+        gt_counts += np.bincount(gt_cls, minlength=len(names))[:len(names)]
+
+    tp = np.concatenate(all_tp) if all_tp else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+    conf = np.concatenate(all_conf) if all_conf else np.zeros(0)
+    cls = np.concatenate(all_cls) if all_cls else np.zeros(0, dtype=np.int64)
+
+    per_class = {}
+    aps = []
+    for c, name in enumerate(names):
+        sel = cls == c
+        if gt_counts[c] == 0 and not sel.any():
+            continue
+        ap = average_precision(tp[sel], conf[sel], gt_counts[c])
+        kept = sel & (conf >= conf_threshold)
+        n_tp = int(tp[kept, 0].sum())
+        per_class[name] = {
+            "gt": int(gt_counts[c]),
+            "precision": round(n_tp / kept.sum(), 4) if kept.any() else 0.0,
+            "recall": round(n_tp / gt_counts[c], 4) if gt_counts[c] else 0.0,
+            "ap50": round(float(ap[0]), 4),
+            "ap50_95": round(float(ap.mean()), 4),
+        }
+        if gt_counts[c]:
+            aps.append(ap)
+
+    kept = conf >= conf_threshold
+    n_tp = int(tp[kept, 0].sum())
+    n_gt = int(gt_counts.sum())
+    aps = np.array(aps) if aps else np.zeros((1, len(IOU_THRESHOLDS)))
+    return {
+        "precision": round(n_tp / kept.sum(), 4) if kept.any() else 0.0,
+        "recall": round(n_tp / n_gt, 4) if n_gt else 0.0,
+        "map50": round(float(aps[:, 0].mean()), 4),
+        "map50_95": round(float(aps.mean()), 4),
+        "per_class": per_class,
+    }
+
+
+# ------------------------------------------------------------
+# Running a configuration through detection_core
+# ------------------------------------------------------------
+def config_models(core, config, model_names):
+    """Models for one configuration (its backend if it names one)."""
+    if config.get("backend"):
+        from inference.detector import load_models
+        _, models = load_models(config["backend"], names=model_names)
+        return models
+    return core.get_models(model_names)
+
+
+def config_predict_args(config, conf=MAP_CONF):
+    """predict() keyword arguments for one configuration, at threshold conf."""
+    args = {"conf": conf}
+    if config.get("imgsz"):
+        args["imgsz"] = config["imgsz"]
+    return args
+
+
+def _run_batch(core, run_models, paths, results_dir, predict_args):
+    from detection_core import ANNOTATE_VECTOR
+
+    out = []
+    for p in paths:
+        t = time.perf_counter()
+        _, _, dets, _ = core.analyze_image(p, results_dir, run_models, annotate=ANNOTATE_VECTOR,
+                                           predict_args=predict_args)
+        out.append((p, dets, (time.perf_counter() - t) * 1000.0))
+    return out
+
+
+_worker_models = None
+_worker_predict_args = None
+
+
+def _init_eval_worker(config, model_names, predict_args):
+    global _worker_models, _worker_predict_args
+    import detection_core as core
+    _worker_models = config_models(core, config, model_names)
+    _worker_predict_args = predict_args
+
+
+def _eval_batch_in_worker(paths, results_dir):
+    import detection_core as core
+    from benchmarks.run_benchmarks import peak_rss_mb
+    return _run_batch(core, _worker_models, paths, Path(results_dir), _worker_predict_args), peak_rss_mb()
+
+
+def _run_pass(config, batches, model_names, workers, results_dir, predict_args):
+    from benchmarks.run_benchmarks import peak_rss_mb, reset_peak_rss
+
+    predictions, latencies = {}, []
+    start = time.perf_counter()
+    if workers:
+        # Fresh worker processes per configuration: their peak RSS is this configuration's
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_eval_worker,
+                                 initargs=(config, model_names, predict_args)) as ex:
+            futures = [ex.submit(_eval_batch_in_worker, b, str(results_dir)) for b in batches]
+            peaks = []
+            for fut in futures:
+                rows, peak = fut.result()
+                peaks.append(peak or 0.0)
+                for p, dets, ms in rows:
+                    predictions[p] = dets
+                    latencies.append(ms)
+        peak = max(peaks) if peaks else None
+    else:
+        import detection_core as core
+        run_models = config_models(core, config, model_names)
+        reset_peak_rss()
+        for b in batches:
+            for p, dets, ms in _run_batch(core, run_models, b, results_dir, predict_args):
+                predictions[p] = dets
+                latencies.append(ms)
+        peak = peak_rss_mb()
+    wall = time.perf_counter() - start
+    return predictions, latencies, peak, wall
+
+
+def run_config(config, samples, model_names=None, workers=0, batch_size=16, work_dir=None):
+    """
+    Predictions, per-image latencies, peak RSS (MB) and wall time for one
+    configuration. Predictions come from the MAP_CONF pass; latency, memory
+    and wall time from a pass at the configuration's conf, since the low
+    mAP threshold inflates post-processing well beyond what the app sees.
+    """
+    paths = [s[0] for s in samples]
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    results_dir = Path(work_dir or tempfile.mkdtemp(prefix="anomaly_eval_"))
+
+    predictions, _, _, _ = _run_pass(config, batches, model_names, workers, results_dir,
+                                     config_predict_args(config))
+    conf = float(config.get("conf", DEFAULT_CONF))
+    _, latencies, peak, wall = _run_pass(config, batches, model_names, workers, results_dir,
+                                         config_predict_args(config, conf=conf))
+    return predictions, latencies, peak, wall
+
+
+def evaluate(data, configs, model_names=None, workers=0, batch_size=16, work_dir=None):
+    """Score every configuration; returns the report dict."""
+    from benchmarks.run_benchmarks import summarize
+
+    names = load_class_names(data)
+    samples = load_dataset(data)
+    print(f"[eval] {len(samples)} images, {len(names)} classes, {len(configs)} configurations")
+
+    report = {"data": str(data), "images": len(samples), "classes": names, "configs": []}
+    for config in configs:
+        name = config.get("name") or "default"
+        print(f"\n[eval] Running configuration '{name}'...")
+        predictions, latencies, peak, wall = run_config(config, samples, model_names, workers,
+                                                        batch_size, work_dir)
+        metrics = score(samples, predictions, names, float(config.get("conf", DEFAULT_CONF)))
+        lat = summarize(latencies)
+        report["configs"].append({
+            "name": name,
+            "config": config,
+            **{k: v for k, v in metrics.items() if k != "per_class"},
+            "latency_p50_ms": lat["p50_ms"],
+            "latency_p95_ms": lat["p95_ms"],
+            "images_per_sec": round(len(samples) / wall, 3) if wall > 0 else None,
+            "peak_rss_mb": round(peak, 1) if peak else None,
+            "per_class": metrics["per_class"],
+        })
+    return report
+
+
+def print_report(report):
+    header = (f"{'config':<18} {'P':>6} {'R':>6} {'mAP50':>7} {'mAP50-95':>9}"
+              f" {'p50 ms':>9} {'p95 ms':>9} {'img/s':>8} {'RSS MB':>8}")
+    print("\n" + header)
+    print("-" * len(header))
+    for c in report["configs"]:
+        print(f"{c['name']:<18} {c['precision']:>6.3f} {c['recall']:>6.3f} {c['map50']:>7.3f}"
+              f" {c['map50_95']:>9.3f} {c['latency_p50_ms']:>9.1f} {c['latency_p95_ms']:>9.1f}"
+              f" {c['images_per_sec'] or 0:>8.2f} {c['peak_rss_mb'] or 0:>8.1f}")
+
+
+def load_configs(args):
+    if args.configs:
+        with open(args.configs, "r", encoding="utf-8") as f:
+            configs = yaml.safe_load(f) or []
+        return configs if isinstance(configs, list) else configs.get("configs", [])
+    if args.imgsz:
+        return [{"name": f"imgsz={s}", "imgsz": s, "conf": args.conf, "backend": args.backend}
+                for s in args.imgsz]
+    return [{"name": "default", "conf": args.conf, "backend": args.backend}]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate detection accuracy vs latency on a labeled dataset")
+    parser.add_argument("--data", required=True, help="Dataset root with data.yaml, images/ and labels/")
+    parser.add_argument("--models", nargs="+", help="Models to run (default: all loaded)")
+    parser.add_argument("--configs", help="YAML list of {name, imgsz, conf, backend} to compare")
+    parser.add_argument("--imgsz", nargs="+", type=int, help="Compare these input sizes")
+    parser.add_argument("--conf", type=float, default=DEFAULT_CONF, help="Confidence threshold for P/R")
+    parser.add_argument("--backend", help="Model backend (ultralytics, fake)")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 = in-process)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Images per worker batch")
+    parser.add_argument("--out", help="Write the full report (incl. per-class metrics) as JSON")
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        # Before detection_core loads its models
+        os.environ["ANOMALY_DETECTOR_BACKEND"] = args.backend
+
+    report = evaluate(args.data, load_configs(args), args.models, args.workers, args.batch_size)
+    print_report(report)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print("\nReport saved:", args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    mp.freeze_support()
+    sys.exit(main())
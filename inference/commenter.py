@@ -1,6 +1,8 @@
 # inference/commenter.py
 import yaml
 
+from inference.rules import compile_rules, evaluate_rules, normalize_label
+
 RULE_FILE = "comment_rules.yaml"
 
 def load_rules():
@@ -12,11 +14,33 @@ def load_rules():
 
 rules = load_rules()
 
+# Spatial rules are compiled once; they are not label rules
+spatial_rules = compile_rules(rules.pop("spatial_rules", None)) if rules else []
+
+# Classes with `type: anomaly`, for gating scripted runs on severity.
+# A rule may set `severity:`; anomalies without one count as "high".
+SEVERITY_LEVELS = ("low", "medium", "high", "critical")
+DEFAULT_ANOMALY_SEVERITY = "high"
+
+anomaly_rules = {
+    normalize_label(k): v for k, v in (rules or {}).items()
+    if isinstance(v, dict) and v.get("type") == "anomaly"
+}
+
+def anomaly_severity(label):
+    """Severity of a detected label if its rule is an anomaly, else None."""
+    rule = anomaly_rules.get(normalize_label(label))
+    if rule is None:
+        return None
+    severity = str(rule.get("severity", DEFAULT_ANOMALY_SEVERITY)).lower()
+    return severity if severity in SEVERITY_LEVELS else DEFAULT_ANOMALY_SEVERITY
+
 def generate_comments(detections):
     if not rules:
         return ["⚠ No comment rules loaded."]
 
     results = []
+    spatial_messages, variants = evaluate_rules(spatial_rules, detections)
 
     for det in detections:
         label = det.get("label", "").lower().strip()
@@ -29,6 +53,17 @@ def generate_comments(detections):
         # Partial match with subrules
         for key, val in rules.items():
             if key in label and isinstance(val, dict):
+                # Classes with type/message entries
+                if "message" in val:
+                    results.append(val["message"])
+                    break
+
+                # Variant chosen by a spatial rule (e.g. fire_extinguisher -> obstructed)
+                variant = variants.get(normalize_label(key))
+                if variant in val:
+                    results.append(val[variant])
+                    break
+
                 matched = False
                 for skey, msg in val.items():
                     if skey in label:
@@ -43,5 +78,7 @@ def generate_comments(detections):
             if "default" in rules:
                 results.append(rules["default"])
 
+    results.extend(spatial_messages)
+
     # Remove duplicates
     return list(dict.fromkeys(results))
@@ -1,7 +1,10 @@
 # inference/detector.py
-from ultralytics import YOLO
 import os, sys
 
+# "ultralytics" (default) loads the .pt files; "fake" returns deterministic
+# stand-in models (inference/fake.py) for benchmarks and tests
+BACKEND_ENV = "ANOMALY_DETECTOR_BACKEND"
+
 
 def resource_path(relative_path):
     """Get absolute path for PyInstaller EXE or normal Python."""
@@ -10,8 +13,8 @@ def resource_path(relative_path):
     return os.path.join(os.path.abspath("."), relative_path)
 
 
-def load_models():
-    cfg = {
+def model_config():
+    return {
         "models": {
             "fire": {"path": resource_path("models/fire_model.pt")},
             "textile": {"path": resource_path("models/textile_model.pt")},
@@ -20,9 +23,23 @@ def load_models():
         }
     }
 
+
+def load_models(backend=None, names=None):
+    """Load the configured models, or only `names` of them. Returns (cfg, {name: model})."""
+    backend = backend or os.environ.get(BACKEND_ENV, "ultralytics")
+
+    cfg = model_config()
+    wanted = {"models": {n: m for n, m in cfg["models"].items() if names is None or n in names}}
+
+    if backend == "fake":
+        from inference.fake import load_fake_models
+        return cfg, load_fake_models(wanted)
+
+    from ultralytics import YOLO
+
     loaded = {}
 
-    for name, meta in cfg["models"].items():
+    for name, meta in wanted["models"].items():
         path = meta["path"]
 
         if not os.path.exists(path):
@@ -0,0 +1,91 @@
+# inference/fake.py
+"""
+Deterministic stand-in for Ultralytics models.
+
+FakeModel.predict returns objects shaped like Ultralytics Results (boxes
+with xyxy/conf/cls rows, names mapping), so detection_core's parsing path
+runs unchanged. Box count and simulated latency are configurable; output
+depends only on the model name and the input image size, never on timing
+or random state.
+"""
+import hashlib
+import os
+import time
+
+import numpy as np
+
+FAKE_BOXES_ENV = "ANOMALY_DETECTOR_FAKE_BOXES"
+FAKE_LATENCY_ENV = "ANOMALY_DETECTOR_FAKE_LATENCY_MS"
+
+# Labels per model, taken from comment_rules.yaml so comments exercise real rules
+FAKE_LABELS = {
+    "fire": ["fire_extinguisher", "obstacle", "cardboard box", "fire waterbucket"],
+    "textile": ["garment materials", "machinery", "human", "sack"],
+    "panel": ["electrical panel close", "electrical panel open", "electrical component", "meter"],
+    "ppe": ["human", "with-helmet", "no-helmet", "Safety-Glasses"],
+}
+
+
+class FakeBox:
+    __slots__ = ("xyxy", "conf", "cls")
+
+    def __init__(self, xyxy, conf, cls):
+        # Same access pattern as Ultralytics: b.xyxy[0].tolist(), float(b.conf[0]), int(b.cls[0])
+        self.xyxy = xyxy[None, :]
+        self.conf = np.array([conf])
+        self.cls = np.array([cls])
+
+
+class FakeResult:
+    def __init__(self, boxes, names):
+        self.boxes = boxes
+        self.names = names
+
+
+class FakeModel:
+    def __init__(self, name, boxes_per_image=5, latency_ms=0.0, imgsz=640):
+        self.name = name
+        self.boxes_per_image = boxes_per_image
+        self.latency_ms = latency_ms
+        self.overrides = {"imgsz": imgsz}
+        labels = FAKE_LABELS.get(name, ["object"])
+        self.names = dict(enumerate(labels))
+
+    @staticmethod
+    def _size(source):
+        if isinstance(source, np.ndarray):
+            return source.shape[1], source.shape[0]
+        if hasattr(source, "size") and not callable(source.size):
+            return source.size  # PIL image
+        from PIL import Image
+        with Image.open(source) as img:
+            return img.size
+
+    def predict(self, source, **kwargs):
+        w, h = self._size(source)
+        seed = int.from_bytes(hashlib.sha1(f"{self.name}:{w}x{h}".encode()).digest()[:8], "little")
+        rng = np.random.default_rng(seed)
+
+        n = self.boxes_per_image
+        x1 = rng.uniform(0, w * 0.8, n)
+        y1 = rng.uniform(0, h * 0.8, n)
+        bw = rng.uniform(w * 0.05, w * 0.2, n)
+        bh = rng.uniform(h * 0.05, h * 0.2, n)
+        xyxy = np.stack([x1, y1, np.minimum(x1 + bw, w), np.minimum(y1 + bh, h)], axis=1)
+        conf = rng.uniform(0.25, 0.99, n)
+        cls = rng.integers(0, len(self.names), n)
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+        # Like Ultralytics, predict(conf=...) drops boxes below the threshold
+        min_conf = kwargs.get("conf") or 0.0
+        boxes = [FakeBox(xyxy[i], conf[i], cls[i]) for i in range(n) if conf[i] >= min_conf]
+        return [FakeResult(boxes, self.names)]
+
+
+def load_fake_models(cfg):
+    boxes = int(os.environ.get(FAKE_BOXES_ENV, "5"))
+    latency = float(os.environ.get(FAKE_LATENCY_ENV, "0"))
+    print(f"[detector] Using fake models ({boxes} boxes/image, {latency} ms latency)")
+    return {name: FakeModel(name, boxes, latency) for name in cfg["models"]}
@@ -0,0 +1,141 @@
+# inference/rules.py
+"""
+Spatial rule engine for context-aware comments.
+
+Rules come from the `spatial_rules:` list in comment_rules.yaml and are
+compiled once. Each rule relates a subject label to one or more object
+labels through a geometric predicate, evaluated for all subject/object
+pairs of an image at once with numpy broadcasting:
+
+    overlaps      subject and object intersect (min_overlap: share of the subject covered)
+    near          gap between the boxes <= max_distance * subject diagonal
+    inside        subject lies inside an object (min_overlap, default 0.9)
+    contains      an object lies inside the subject (min_overlap, default 0.9)
+    lacks_inside  subject contains no object (e.g. a person box with no helmet box in it)
+
+A firing rule adds its `message`, and/or picks `variant` of the subject's
+dict entry in comment_rules.yaml (fire_extinguisher -> obstructed).
+"""
+import numpy as np
+
+RELATIONS = ("overlaps", "near", "inside", "contains", "lacks_inside")
+
+DEFAULT_MIN_OVERLAP = {
+    "overlaps": 0.0,
+    "inside": 0.9,
+    "contains": 0.9,
+    "lacks_inside": 0.9,
+}
+
+
+def normalize_label(label):
+    return " ".join(str(label).lower().replace("_", " ").replace("-", " ").split())
+
+
+class SpatialRule:
+    def __init__(self, spec):
+        self.name = spec.get("name", "")
+        self.subject = normalize_label(spec["subject"])
+        objects = spec.get("objects", spec.get("object", []))
+        if isinstance(objects, str):
+            objects = [objects]
+        self.objects = [normalize_label(o) for o in objects]
+
+        self.relation = spec.get("relation", "overlaps")
+        if self.relation not in RELATIONS:
+            raise ValueError(f"Rule '{self.name}': unknown relation '{self.relation}'")
+
+        self.min_overlap = float(spec.get("min_overlap", DEFAULT_MIN_OVERLAP.get(self.relation, 0.0)))
+        self.max_distance = float(spec.get("max_distance", 0.5))
+        self.min_confidence = float(spec.get("min_confidence", 0.0))
+        self.message = spec.get("message")
+        self.variant = spec.get("variant")
+
+    def evaluate(self, labels, boxes, conf):
+        """Boolean per detection: True where the detection is a subject this rule fires for."""
+        keep = conf >= self.min_confidence
+        subj = (labels == self.subject) & keep
+        if not subj.any():
+            return subj
+
+        obj = np.isin(labels, self.objects) & keep
+        fired = np.zeros(len(labels), dtype=bool)
+        if not obj.any():
+            # No objects at all: only "lacks_inside" can fire
+            if self.relation == "lacks_inside":
+                fired[subj] = True
+            return fired
+
+        s = boxes[subj][:, None, :]  # (n, 1, 4)
+        o = boxes[obj][None, :, :]   # (1, m, 4)
+
+        if self.relation == "near":
+            dx = np.maximum(0.0, np.maximum(s[..., 0] - o[..., 2], o[..., 0] - s[..., 2]))
+            dy = np.maximum(0.0, np.maximum(s[..., 1] - o[..., 3], o[..., 1] - s[..., 3]))
+            diag = np.hypot(s[..., 2] - s[..., 0], s[..., 3] - s[..., 1])
+            pair = np.hypot(dx, dy) <= self.max_distance * diag
+        else:
+            iw = np.clip(np.minimum(s[..., 2], o[..., 2]) - np.maximum(s[..., 0], o[..., 0]), 0, None)
+            ih = np.clip(np.minimum(s[..., 3], o[..., 3]) - np.maximum(s[..., 1], o[..., 1]), 0, None)
+            inter = iw * ih
+            area_s = (s[..., 2] - s[..., 0]) * (s[..., 3] - s[..., 1])
+            area_o = (o[..., 2] - o[..., 0]) * (o[..., 3] - o[..., 1])
+
+            if self.relation == "overlaps":
+                pair = (inter > 0) & (inter >= self.min_overlap * area_s)
+            elif self.relation == "inside":
+                pair = (inter > 0) & (inter >= self.min_overlap * area_s)
+            else:  # contains / lacks_inside
+                pair = (inter > 0) & (inter >= self.min_overlap * area_o)
+
+        hit = pair.any(axis=1)
+        if self.relation == "lacks_inside":
+            hit = ~hit
+        fired[np.flatnonzero(subj)[hit]] = True
+        return fired
+
+
+def compile_rules(specs):
+    compiled = []
+    for spec in specs or []:
+        try:
+            compiled.append(SpatialRule(spec))
+        except (KeyError, ValueError, TypeError) as e:
+            print("⚠ Skipping invalid spatial rule:", spec, e)
+    return compiled
+
+
+def detection_arrays(detections):
+    """Normalized labels, boxes (N, 4) and confidences as numpy arrays."""
+    n = len(detections)
+    labels = np.array([normalize_label(d.get("label", "")) for d in detections], dtype=object)
+    boxes = np.zeros((n, 4), dtype=np.float64)
+    conf = np.zeros(n, dtype=np.float64)
+    for i, d in enumerate(detections):
+        bbox = d.get("bbox")
+        if bbox and len(bbox) == 4:
+            boxes[i] = bbox
+        conf[i] = float(d.get("confidence", 0.0))
+    return labels, boxes, conf
+
+
+def evaluate_rules(compiled, detections):
+    """
+    Run every compiled rule over one image's detections.
+
+    Returns (messages, variants): messages of rules that fired, in rule
+    order, and {normalized subject label: variant} for rules with a variant.
+    """
+    messages, variants = [], {}
+    if not compiled or not detections:
+        return messages, variants
+
+    labels, boxes, conf = detection_arrays(detections)
+    for rule in compiled:
+        if not rule.evaluate(labels, boxes, conf).any():
+            continue
+        if rule.message:
+            messages.append(rule.message)
+        if rule.variant:
+            variants.setdefault(rule.subject, rule.variant)
+    return messages, variants
@@ -1,6 +1,9 @@
 # main.py
 import sys
 import os
+import io
+import multiprocessing
+from collections import deque
 from pathlib import Path
 
 from PyQt6.QtWidgets import (
@@ -18,33 +21,290 @@ from PyQt6.QtWidgets import (
     QCheckBox,
     QSizePolicy,
     QScrollArea,
+    QLineEdit,
+    QDoubleSpinBox,
+    QDateEdit,
+    QFormLayout,
+    QSpinBox,
 )
-from PyQt6.QtGui import QPixmap
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QPixmap, QImageReader, QImageIOHandler, QPainter, QPen, QColor, QFont
+from PyQt6.QtCore import Qt, QObject, QThread, QSize, QDate, QDateTime, QTimer, QBuffer, QByteArray, pyqtSignal
+
+from detection_core import (
+    process_session_image,
+    new_session_context,
+    ensure_dirs,
+    create_session_folder,
+    export_annotated_images,
+    finalize_results,
+    get_findings_store,
+    ANNOTATE_RASTER,
+    ANNOTATE_VECTOR,
+    RESULTS_LOG,
+    resume_session,
+    read_results,
+    governor,
+    tune_in_process,
+    BASE_DIR,
+    get_models,
+)
+from inference.detector import model_config
+from scheduler import WorkScheduler, SessionLimitError, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from process_pool import InferencePool, physical_cores
+from utils.journal import SessionJournal
+from utils import telemetry
+from utils.archive import PackedSession, PACK_EXT, close_open_packs, locate
+from utils.result_window import ResultWindow
+from utils.viz import overlay_scale
+
+METRICS_PORT_ENV = "ANOMALY_DETECTOR_METRICS_PORT"
+
+# Streaming mode: results kept in memory for Prev/Next, and comments kept for "View Full Logs"
+STREAM_WINDOW = 200
+STREAM_LOG_LIMIT = 5000
+
+
+# ---------------- Preview loading ---------------- #
+def load_preview_pixmap(path, width, height, detections=None):
+    """
+    Load an image already scaled to fit width x height.
+
+    QImageReader.setScaledSize lets the JPEG plugin decode at a reduced DCT
+    scale instead of decoding the full 20+ MP image and shrinking it.
+    If detections are given, their boxes are drawn as an overlay (vector
+    annotation mode) in full-resolution coordinates scaled to the preview.
+    The preview is EXIF-rotated like decode_image and draw_boxes, so the
+    boxes are in upright coordinates too.
+    `path` may also be the encoded image bytes (a member of a packed session).
+    """
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        buf = QBuffer()
+        buf.setData(QByteArray(bytes(path)))
+        buf.open(QBuffer.OpenModeFlag.ReadOnly)
+        reader = QImageReader(buf)
+    else:
+        reader = QImageReader(str(path))
+    reader.setAutoTransform(True)
+    # size() and setScaledSize() are in stored orientation; the rotation is applied after decoding
+    full = reader.size()
+    rotated = bool(reader.transformation() & QImageIOHandler.Transformation.TransformationRotate90)
+    box = QSize(max(height, 1), max(width, 1)) if rotated else QSize(max(width, 1), max(height, 1))
+    if full.isValid() and (full.width() > box.width() or full.height() > box.height()):
+        size = QSize(full)
+        size.scale(box, Qt.AspectRatioMode.KeepAspectRatio)
+        reader.setScaledSize(size)
+    pix = QPixmap.fromImage(reader.read())
+
+    scale = overlay_scale((full.width(), full.height()), rotated, pix.width()) if full.isValid() else None
+    if detections and not pix.isNull() and scale:
+        draw_overlay(pix, detections, scale)
+    return pix
+
+
+def draw_overlay(pix, detections, scale):
+    painter = QPainter(pix)
+    painter.setPen(QPen(QColor("red"), 2))
+    font = QFont()
+    font.setPixelSize(14)
+    painter.setFont(font)
+    metrics = painter.fontMetrics()
+
+    for det in detections:
+        try:
+            x1, y1, x2, y2 = (v * scale for v in det["bbox"])
+            label = f"{det['label']} ({det['confidence']:.2f})"
+        except Exception as e:
+            print("Overlay error:", e)
+            continue
+
+        painter.drawRect(int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+        text_w, text_h = metrics.horizontalAdvance(label) + 4, metrics.height()
+        painter.fillRect(int(x1), int(y1) - text_h, text_w, text_h, QColor("red"))
+        painter.setPen(QColor("white"))
+        painter.drawText(int(x1) + 2, int(y1) - metrics.descent(), label)
+        painter.setPen(QPen(QColor("red"), 2))
+
+    painter.end()
+
+
+# ---------------- Scheduler -> Qt bridge ---------------- #
+class SchedulerBridge(QObject):
+    """Runs the WorkScheduler and re-emits its callbacks as Qt signals (queued to the GUI thread)."""
+
+    one_done = pyqtSignal(object, str, str, list, list)  # session, image, out_path, detections, comments
+    session_done = pyqtSignal(object)
+
+    def __init__(self, max_sessions=2, workers=1):
+        super().__init__()
+        self.scheduler = WorkScheduler(
+            self._handle,
+            on_result=self._on_result,
+            on_session_done=self._on_session_done,
+            max_sessions=max_sessions,
+            workers=workers,
+        )
+
+    @staticmethod
+    def _handle(task, checkpoint):
+        return process_session_image(task.path, task.session.context, checkpoint=checkpoint)
 
-from detection_core import run_inference_on_path, ensure_dirs, create_session_folder, cfg, models
+    def _on_result(self, task, result, error):
+        if error is not None:
+            self.one_done.emit(task.session, task.path, "", [], [f"Error: {error}"])
+        else:
+            out, dets, comments = result
+            self.one_done.emit(task.session, task.path, out, dets, comments)
+
+    def _on_session_done(self, session):
+        try:
+            finalize_results(session.context["results_dir"])
+        except Exception as e:
+            # The log stays in place; Resume or Export folds it in later
+            print("EXCEL BUILD ERROR:", e)
+        journal = session.context.get("journal")
+        if journal is not None:
+            journal.close()
+        telemetry.flush(session.context["session_folder"])
+        self.session_done.emit(session)
+
+
+# ---------------- Raster export off the GUI thread ---------------- #
+class ExportThread(QThread):
+    exported = pyqtSignal(int)
+
+    def __init__(self, results_dir):
+        super().__init__()
+        self.results_dir = results_dir
+
+    def run(self):
+        try:
+            count = export_annotated_images(self.results_dir)
+        except Exception as e:
+            print("EXPORT ERROR:", e)
+            count = 0
+        self.exported.emit(count)
 
 
-# ---------------- Worker Thread ---------------- #
-class WorkerThread(QThread):
-    one_done = pyqtSignal(str, list, list)
-    done = pyqtSignal()
+# ---------------- Findings search panel ---------------- #
+class SearchPanel(QWidget):
+    """Query the cross-session findings store; selecting a hit shows it in the main preview."""
 
-    def __init__(self, files, session_results_dir, enabled_models):
+    def __init__(self, app):
         super().__init__()
-        self.files = files
-        self.session_results_dir = session_results_dir
-        # enabled_models: dict name->YOLO model object (Ultralytics)
-        self.enabled_models = enabled_models
+        self.app = app
+        self.setWindowTitle("Search Findings")
+        self.resize(700, 600)
+
+        self.label_edit = QLineEdit()
+        self.label_edit.setPlaceholderText("e.g. no-helmet")
+        self.model_edit = QLineEdit()
+        self.min_conf = QDoubleSpinBox()
+        self.min_conf.setRange(0.0, 1.0)
+        self.min_conf.setSingleStep(0.05)
+        self.min_conf.setValue(0.0)
+        self.since = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.since.setCalendarPopup(True)
+        self.text_edit = QLineEdit()
+        self.text_edit.setPlaceholderText("words in comments")
+
+        form = QFormLayout()
+        form.addRow("Label", self.label_edit)
+        form.addRow("Model", self.model_edit)
+        form.addRow("Min confidence", self.min_conf)
+        form.addRow("Since", self.since)
+        form.addRow("Comments", self.text_edit)
+
+        self.btn_search = QPushButton("Search")
+        self.status = QLabel("")
+        self.results = QListWidget()
 
-    def run(self):
-        for f in self.files:
-            try:
-                out, dets, comments = run_inference_on_path(f, self.session_results_dir, self.enabled_models)
-                self.one_done.emit(out, dets, comments)
-            except Exception as e:
-                self.one_done.emit("", [], [f"Error: {e}"])
-        self.done.emit()
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addWidget(self.btn_search)
+        layout.addWidget(self.status)
+        layout.addWidget(self.results, stretch=1)
+        self.setLayout(layout)
+
+        self.btn_search.clicked.connect(self.run_query)
+        self.label_edit.returnPressed.connect(self.run_query)
+        self.results.itemClicked.connect(self.open_hit)
+
+    def run_query(self):
+        since = QDateTime(self.since.date().startOfDay()).toSecsSinceEpoch()
+        try:
+            hits = get_findings_store().query(
+                label=self.label_edit.text().strip() or None,
+                model=self.model_edit.text().strip() or None,
+                min_confidence=self.min_conf.value() or None,
+                since=since,
+                text=self.text_edit.text().strip() or None,
+            )
+        except Exception as e:
+            QMessageBox.warning(self, "Search error", str(e))
+            return
+
+        self.results.clear()
+        for h in hits:
+            when = QDateTime.fromSecsSinceEpoch(int(h["ts"])).toString("yyyy-MM-dd HH:mm")
+            item = QListWidgetItem(f"{when}  {h['label']} ({h['confidence']:.2f})  "
+                                   f"[{h['model']}]  {os.path.basename(h['image_path'])}")
+            item.setData(Qt.ItemDataRole.UserRole, h)
+            self.results.addItem(item)
+        self.status.setText(f"{len(hits)} detections")
+
+    def open_hit(self, item):
+        h = item.data(Qt.ItemDataRole.UserRole)
+        if h["annotated_path"] and os.path.exists(h["annotated_path"]):
+            self.app.show_preview(h["annotated_path"])
+        else:
+            dets = get_findings_store().image_detections(h["image_id"])
+            self.app.show_preview(h["image_path"], dets)
+        self.app.logs.clear()
+        for c in (h["comments"] or "").split("; "):
+            if c:
+                self.app.logs.addItem(QListWidgetItem(c))
+
+
+# ---------------- Performance panel ---------------- #
+class PerformancePanel(QWidget):
+    """Live p50/p95 per stage, counters and gauges from utils.telemetry."""
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Performance")
+        self.resize(520, 420)
+
+        self.stages = QListWidget()
+        self.counters = QLabel("")
+        self.counters.setWordWrap(True)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Stage latency (recent window)"))
+        layout.addWidget(self.stages, stretch=1)
+        layout.addWidget(self.counters)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        snap = telemetry.snapshot()
+        self.stages.clear()
+        if not snap["stages"]:
+            self.stages.addItem(QListWidgetItem("No samples yet (is telemetry enabled?)"))
+        for stage, st in sorted(snap["stages"].items()):
+            self.stages.addItem(QListWidgetItem(
+                f"{stage:<24} p50 {st['p50_ms']:>9.1f} ms   p95 {st['p95_ms']:>9.1f} ms   n={st['n']}"
+            ))
+        parts = [f"{k}: {v}" for k, v in sorted(snap["counters"].items())]
+        parts += [f"{k}: {v:.1f}" for k, v in sorted(snap["gauges"].items()) if v is not None]
+        self.counters.setText("   ".join(parts))
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        return super().closeEvent(event)
 
 
 # ---------------- Application UI ---------------- #
@@ -61,6 +321,16 @@ class App(QWidget):
         self.session_folder = None
         self.upload_dir = None
         self.results_dir = None
+        self.active_session = None  # scheduler Session shown in the preview
+        self.packed = None          # PackedSession being browsed, if any
+        self.export_thread = None
+
+        self.cores = physical_cores()
+        self.pool = None
+        self.bridge = SchedulerBridge(max_sessions=2)
+        self.scheduler = self.bridge.scheduler
+        self.bridge.one_done.connect(self.update_result)
+        self.bridge.session_done.connect(self.finish_session)
 
         self.current_results = []
         self.current_index = 0
@@ -77,22 +347,36 @@ class App(QWidget):
         self.progress = QProgressBar()
         self.progress.setVisible(False)
 
+        self.btn_pause = QPushButton("Pause")
+        self.btn_cancel = QPushButton("Cancel Session")
+        self.btn_pause.setEnabled(False)
+        self.btn_cancel.setEnabled(False)
+
+        ctrl_row = QHBoxLayout()
+        ctrl_row.addWidget(self.progress, stretch=1)
+        ctrl_row.addWidget(self.btn_pause)
+        ctrl_row.addWidget(self.btn_cancel)
+
         # Buttons
         self.btn_single = QPushButton("Select Single Image")
         self.btn_multi = QPushButton("Select Multiple Images")
+        self.btn_resume = QPushButton("Resume Session")
+        self.btn_packed = QPushButton("Open Packed Session")
         self.btn_prev = QPushButton("Previous Image")
         self.btn_next = QPushButton("Next Image")
 
         btn_row = QHBoxLayout()
         btn_row.addWidget(self.btn_single)
         btn_row.addWidget(self.btn_multi)
+        btn_row.addWidget(self.btn_resume)
+        btn_row.addWidget(self.btn_packed)
         btn_row.addWidget(self.btn_prev)
         btn_row.addWidget(self.btn_next)
 
         left_layout = QVBoxLayout()
         left_layout.addWidget(self.preview, stretch=5)
         left_layout.addLayout(btn_row)
-        left_layout.addWidget(self.progress)
+        left_layout.addLayout(ctrl_row)
 
         # ---------------- RIGHT (Models + logs) ---------------- #
 
@@ -100,14 +384,38 @@ class App(QWidget):
         model_layout = QVBoxLayout()
         model_layout.addWidget(QLabel("Models to Run:"))
 
-        # Build checkboxes from cfg (model names)
-        # cfg["models"] is expected to be a dict mapping model keys -> metadata
-        for mname in cfg["models"].keys():
+        # Build checkboxes from the model config (model names); nothing is loaded yet
+        # model_config()["models"] is expected to be a dict mapping model keys -> metadata
+        for mname in model_config()["models"].keys():
             cb = QCheckBox(mname)
             cb.setChecked(True)
             self.model_checks[mname] = cb
             model_layout.addWidget(cb)
 
+        self.chk_skip_dupes = QCheckBox("Skip near-duplicate images")
+        self.chk_skip_dupes.setChecked(False)
+        model_layout.addWidget(self.chk_skip_dupes)
+
+        self.chk_overlay = QCheckBox("Overlay boxes (don't save annotated copies)")
+        self.chk_overlay.setChecked(False)
+        model_layout.addWidget(self.chk_overlay)
+
+        self.chk_streaming = QCheckBox("Streaming mode (low memory for huge batches)")
+        self.chk_streaming.setChecked(False)
+        model_layout.addWidget(self.chk_streaming)
+
+        self.chk_telemetry = QCheckBox("Enable telemetry")
+        self.chk_telemetry.setChecked(telemetry.enabled())
+        model_layout.addWidget(self.chk_telemetry)
+
+        pool_row = QHBoxLayout()
+        pool_row.addWidget(QLabel("Worker processes (0 = in-app):"))
+        self.spin_pool = QSpinBox()
+        self.spin_pool.setRange(0, self.cores)
+        self.spin_pool.setValue(0)
+        pool_row.addWidget(self.spin_pool)
+        model_layout.addLayout(pool_row)
+
         model_widget = QWidget()
         model_widget.setLayout(model_layout)
 
@@ -122,15 +430,21 @@ class App(QWidget):
 
         self.btn_open_excel = QPushButton("Open Results.xlsx")
         self.btn_browse_saved = QPushButton("Browse Saved Annotated Images")
+        self.btn_export = QPushButton("Export Annotated Images")
         self.btn_view_logs = QPushButton("View Full Logs")
+        self.btn_search = QPushButton("Search Findings")
+        self.btn_perf = QPushButton("Performance")
 
         right_layout = QVBoxLayout()
         right_layout.addWidget(model_scroll)
         right_layout.addWidget(self.btn_open_excel)
         right_layout.addWidget(self.btn_browse_saved)
+        right_layout.addWidget(self.btn_export)
         right_layout.addWidget(QLabel("Logs"))
         right_layout.addWidget(self.logs, stretch=1)
         right_layout.addWidget(self.btn_view_logs)
+        right_layout.addWidget(self.btn_search)
+        right_layout.addWidget(self.btn_perf)
         right_layout.addStretch()
 
         # ---------------- Main Layout ---------------- #
@@ -142,11 +456,19 @@ class App(QWidget):
         # ---------------- Connections ---------------- #
         self.btn_single.clicked.connect(self.open_single)
         self.btn_multi.clicked.connect(self.open_multi)
+        self.btn_resume.clicked.connect(self.resume_existing_session)
+        self.btn_packed.clicked.connect(self.open_packed_session)
         self.btn_prev.clicked.connect(self.prev_image)
         self.btn_next.clicked.connect(self.next_image)
+        self.btn_pause.clicked.connect(self.toggle_pause)
+        self.btn_cancel.clicked.connect(self.cancel_session)
         self.btn_open_excel.clicked.connect(self.open_excel)
         self.btn_browse_saved.clicked.connect(self.browse_saved)
+        self.btn_export.clicked.connect(self.export_annotated)
         self.btn_view_logs.clicked.connect(self.view_all_logs)
+        self.btn_search.clicked.connect(self.open_search)
+        self.btn_perf.clicked.connect(self.open_performance)
+        self.chk_telemetry.toggled.connect(self.toggle_telemetry)
 
     # ------------------------------------------------------------
     # File Selection & Session Handling
@@ -154,23 +476,31 @@ class App(QWidget):
     def open_single(self):
         f, _ = QFileDialog.getOpenFileName(self, "Select Image", "", "Images (*.png *.jpg *.jpeg)")
         if f:
-            self.start_new_session([f])
+            # A single image jumps ahead of any batch already running
+            self.start_new_session([f], priority=PRIORITY_INTERACTIVE)
 
     def open_multi(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Select Images", "", "Images (*.png *.jpg *.jpeg)")
         if files:
             self.start_new_session(files)
 
-    def start_new_session(self, files):
+    def session_capacity_ok(self):
+        if self.scheduler.active_sessions() >= self.scheduler.max_sessions:
+            QMessageBox.warning(self, "Busy", "Too many sessions are running. Wait for one to finish or cancel it.")
+            return False
+        return True
+
+    def start_new_session(self, files, priority=PRIORITY_BATCH):
+        if not self.session_capacity_ok():
+            return
+
         # Create session folder
         self.session_folder = create_session_folder()
         self.upload_dir = self.session_folder / "uploads"
         self.results_dir = self.session_folder / "results"
 
-        self.current_results = []
-        self.current_index = 0
-        self.all_logs = []
-        self.logs.clear()
+        self.close_packed()
+        self.reset_results()
 
         # Copy files into session/uploads/
         saved_files = []
@@ -189,64 +519,222 @@ class App(QWidget):
             QMessageBox.warning(self, "Upload error", "No files were saved for processing.")
             return
 
+        self.run_session_files(saved_files, priority=priority)
+
+    def resume_existing_session(self):
+        if not self.session_capacity_ok():
+            return
+
+        folder = QFileDialog.getExistingDirectory(self, "Select Session Folder", str(BASE_DIR / "sessions"))
+        if not folder:
+            return
+
+        try:
+            session, pending = resume_session(folder)
+        except FileNotFoundError as e:
+            QMessageBox.warning(self, "Resume error", str(e))
+            return
+
+        if not pending:
+            QMessageBox.information(self, "Resume", "All images in this session were already processed.")
+            return
+
+        self.session_folder = session
+        self.upload_dir = session / "uploads"
+        self.results_dir = session / "results"
+
+        self.close_packed()
+        self.reset_results()
+
+        self.run_session_files(pending, resumed=True)
+
+    def open_packed_session(self):
+        file, _ = QFileDialog.getOpenFileName(
+            self, "Open Packed Session", str(BASE_DIR / "sessions"), f"Packed sessions (*{PACK_EXT})"
+        )
+        if not file:
+            return
+
+        try:
+            packed = PackedSession(file)
+            rows = read_results(io.BytesIO(packed.read("results/results.xlsx")))
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, "Packed session", f"Could not read {file}: {e}")
+            return
+
+        # Browse only: results already exist, nothing is queued
+        self.close_packed()
+        self.session_folder = None
+        self.upload_dir = None
+        self.results_dir = None
+        self.active_session = None
+        self.packed = packed
+
+        self.current_results = [
+            (annotated or actual, dets, comments, not annotated)
+            for actual, annotated, dets, comments in rows
+        ]
+        self.current_index = 0
+        self.all_logs = [c for r in self.current_results for c in r[2]]
+        if self.current_results:
+            self.show_current_image()
+        else:
+            QMessageBox.information(self, "Packed session", "No results in this session.")
+
+    def reset_results(self):
+        """
+        Fresh result list for the current session. In streaming mode only a
+        window of recent results stays in memory; older ones are paged back
+        in from the findings store when browsed, and logs keep the newest.
+        """
+        if self.chk_streaming.isChecked() and self.session_folder is not None:
+            self.current_results = ResultWindow(get_findings_store(), self.session_folder.name,
+                                                capacity=STREAM_WINDOW)
+            self.all_logs = deque(maxlen=STREAM_LOG_LIMIT)
+        else:
+            self.current_results = []
+            self.all_logs = []
+        self.current_index = 0
+        self.logs.clear()
+
+    def close_packed(self):
+        if self.packed is not None:
+            self.packed.close()
+            self.packed = None
+        # Archives opened for search hits / moved sessions (see show_preview)
+        close_open_packs()
+
+    def run_session_files(self, saved_files, resumed=False, priority=PRIORITY_BATCH):
+        journal = SessionJournal(self.session_folder)
+        if not resumed:
+            journal.queue(saved_files)
+
         # Determine enabled models from checkboxes
-        enabled = {}
-        for name, cb in self.model_checks.items():
-            if cb.isChecked():
-                # only include models that were actually loaded into 'models'
-                if name in models:
-                    enabled[name] = models[name]
-                else:
-                    print(f"Model '{name}' checked in UI but not loaded on disk; skipping.")
+        checked = [name for name, cb in self.model_checks.items() if cb.isChecked()]
+        enabled = get_models(checked) if checked else {}
+        for name in checked:
+            # only include models that could actually be loaded from disk
+            if name not in enabled:
+                print(f"Model '{name}' checked in UI but not loaded on disk; skipping.")
 
         # If no model selected, fallback to all loaded models
         if not enabled:
-            enabled = models.copy()
+            enabled = get_models()
+
+        annotate = ANNOTATE_VECTOR if self.chk_overlay.isChecked() else ANNOTATE_RASTER
+        pool = self.get_pool()
+        self.match_scheduler_to_pool(pool)
+        ctx = new_session_context(self.session_folder, saved_files, enabled, journal=journal,
+                                  skip_duplicates=self.chk_skip_dupes.isChecked(), annotate=annotate,
+                                  pool=pool, stream=self.chk_streaming.isChecked())
+        try:
+            self.active_session = self.scheduler.submit_session(saved_files, ctx, priority=priority)
+        except SessionLimitError as e:
+            journal.close()
+            QMessageBox.warning(self, "Busy", str(e))
+            return
 
-        # Run detection
         self.progress.setVisible(True)
-        self.progress.setMaximum(len(saved_files))
-        self.progress.setValue(0)
+        self.btn_pause.setEnabled(True)
+        self.btn_cancel.setEnabled(True)
+        self.refresh_progress()
+
+    def get_pool(self):
+        size = self.spin_pool.value()
+        if size == 0:
+            return None
+        if self.pool is not None and self.pool.size != size:
+            if self.scheduler.active_sessions() > 0:
+                return self.pool  # in use by a running session; keep its size
+            self.pool.shutdown()
+            self.pool = None
+        if self.pool is None:
+            self.pool = InferencePool(size)
+        return self.pool
+
+    def match_scheduler_to_pool(self, pool):
+        # One scheduler thread per pool process keeps every worker busy; in-app
+        # inference is serialized, so extra threads would only pre-claim
+        # tasks and defeat re-prioritization
+        if self.scheduler.active_sessions() == 0:
+            if pool is not None:
+                # Pool workers each have a fixed thread share; tune how many are kept busy
+                governor.tune(self.scheduler.set_workers, 1, pool.size, pool.size, "pipeline workers")
+            else:
+                self.scheduler.set_workers(1)
+                tune_in_process()
 
-        self.thread = WorkerThread(saved_files, self.results_dir, enabled)
-        self.thread.one_done.connect(self.update_result)
-        self.thread.done.connect(self.finish_session)
-        self.thread.start()
+    def toggle_pause(self):
+        if self.scheduler.paused:
+            self.scheduler.resume()
+            self.btn_pause.setText("Pause")
+        else:
+            self.scheduler.pause()
+            self.btn_pause.setText("Resume")
+
+    def cancel_session(self):
+        # The session in the preview, else the newest one still running in the background
+        target = self.active_session
+        if target is None:
+            running = [s for s in self.scheduler.running_sessions() if not s.cancelled]
+            target = running[-1] if running else None
+        if target is not None:
+            self.scheduler.cancel(target)
+
+    def refresh_progress(self):
+        done, total = self.scheduler.progress()
+        self.progress.setMaximum(max(total, 1))
+        self.progress.setValue(done)
+
+        queued = self.scheduler.queue_length()
+        eta = self.scheduler.eta_seconds()
+        eta_text = f" · ETA {int(eta) // 60}:{int(eta) % 60:02d}" if eta is not None and queued else ""
+        self.progress.setFormat(f"%v/%m · {queued} queued{eta_text}")
 
     # ------------------------------------------------------------
     # Per-image updates
     # ------------------------------------------------------------
-    def update_result(self, out, detections, comments):
-        self.current_results.append((out, detections, comments))
-        self.current_index = len(self.current_results) - 1
+    def update_result(self, session, image_path, out, detections, comments):
+        self.refresh_progress()
+        if session is not self.active_session:
+            # Background session: results are already on disk, keep the preview on the active one
+            return
 
-        if out and os.path.exists(out):
-            pix = QPixmap(out)
-            if not pix.isNull():
-                self.preview.setPixmap(
-                    pix.scaled(
-                        self.preview.width(),
-                        self.preview.height(),
-                        Qt.AspectRatioMode.KeepAspectRatio,
-                        Qt.TransformationMode.SmoothTransformation,
-                    )
-                )
-            else:
-                self.preview.setText("Preview not available")
+        overlay = session.context.get("annotate") == ANNOTATE_VECTOR
+        entry = (out, detections, comments, overlay)
+        if isinstance(self.current_results, ResultWindow):
+            # Indexed by findings-store row: errors and unsaved results have no place in it
+            index = self.current_results.append(entry, image_path) if out else None
+        else:
+            self.current_results.append(entry)
+            index = len(self.current_results) - 1
+
+        if index is not None:
+            self.current_index = index
+            self.show_preview(out, detections if overlay else None)
 
         self.logs.clear()
         for c in comments:
             self.logs.addItem(QListWidgetItem(c))
             self.all_logs.append(c)
 
-        self.progress.setValue(self.progress.value() + 1)
-
     # ------------------------------------------------------------
     # After batch is finished
     # ------------------------------------------------------------
-    def finish_session(self):
-        self.progress.setVisible(False)
-        QMessageBox.information(self, "Complete", "Batch processing finished!")
+    def finish_session(self, session):
+        if self.scheduler.active_sessions() == 0:
+            self.progress.setVisible(False)
+            self.btn_pause.setEnabled(False)
+            self.btn_cancel.setEnabled(False)
+        else:
+            self.refresh_progress()
+
+        if session is self.active_session:
+            self.active_session = None
+            if session.cancelled:
+                QMessageBox.information(self, "Cancelled", "Session cancelled. Use Resume Session to continue it later.")
+            else:
+                QMessageBox.information(self, "Complete", "Batch processing finished!")
 
     # ------------------------------------------------------------
     # Browsing results
@@ -260,27 +748,75 @@ class App(QWidget):
         if self.current_index < len(self.current_results) - 1:
             self.current_index += 1
             self.show_current_image()
+        elif self.active_session is not None:
+            # User is waiting on the next image: move it to the front of the queue
+            nxt = self.scheduler.next_pending(self.active_session)
+            if nxt is not None:
+                self.scheduler.promote(self.active_session, nxt)
 
     def show_current_image(self):
-        out, dets, comments = self.current_results[self.current_index]
-        if out and os.path.exists(out):
-            pix = QPixmap(out)
-            if not pix.isNull():
-                self.preview.setPixmap(
-                    pix.scaled(
-                        self.preview.width(),
-                        self.preview.height(),
-                        Qt.AspectRatioMode.KeepAspectRatio,
-                        Qt.TransformationMode.SmoothTransformation,
-                    )
-                )
-            else:
-                self.preview.setText("Preview not available")
+        try:
+            out, dets, comments, overlay = self.current_results[self.current_index]
+        except IndexError:
+            self.preview.setText("Result not available")
+            return
+        self.show_preview(out, dets if overlay else None)
 
         self.logs.clear()
         for c in comments:
             self.logs.addItem(QListWidgetItem(c))
 
+    def show_preview(self, path, overlay_detections=None):
+        if not path:
+            return
+        source = path
+        if not os.path.exists(path):
+            # The session may have been packed since: read the file out of the archive
+            member = self.packed.member_for(path) if self.packed is not None else None
+            if member is not None:
+                source = self.packed.read(member)
+            else:
+                found = locate(path)
+                if found is None:
+                    return
+                source = found[0].read(found[1])
+        pix = load_preview_pixmap(source, self.preview.width(), self.preview.height(), overlay_detections)
+        if not pix.isNull():
+            self.preview.setPixmap(
+                pix.scaled(
+                    self.preview.width(),
+                    self.preview.height(),
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                )
+            )
+        else:
+            self.preview.setText("Preview not available")
+
+    # ------------------------------------------------------------
+    # Export raster annotations (overlay-mode sessions)
+    # ------------------------------------------------------------
+    def export_annotated(self):
+        if self.results_dir is None or self.export_thread is not None:
+            return
+        if self.active_session is not None:
+            # The worker is still appending to this session's workbook
+            QMessageBox.information(self, "Export", "Wait for the session to finish before exporting.")
+            return
+
+        self.btn_export.setEnabled(False)
+        self.btn_export.setText("Exporting...")
+        self.export_thread = ExportThread(self.results_dir)
+        self.export_thread.exported.connect(self.export_finished)
+        self.export_thread.start()
+
+    def export_finished(self, count):
+        self.export_thread.wait()
+        self.export_thread = None
+        self.btn_export.setEnabled(True)
+        self.btn_export.setText("Export Annotated Images")
+        QMessageBox.information(self, "Export", f"Exported {count} annotated images.")
+
     # ------------------------------------------------------------
     # Open Excel
     # ------------------------------------------------------------
@@ -291,6 +827,8 @@ class App(QWidget):
         excel_file = self.results_dir / "results.xlsx"
         if excel_file.exists():
             os.startfile(excel_file)
+        elif (self.results_dir / RESULTS_LOG).exists():
+            QMessageBox.information(self, "Streaming", "results.xlsx is built when the streaming session ends.")
         else:
             QMessageBox.warning(self, "Not Found", "No Excel file in this session.")
 
@@ -305,7 +843,7 @@ class App(QWidget):
             self, "Open Annotated Image", str(self.results_dir), "Images (*.png *.jpg *.jpeg)"
         )
         if file:
-            pix = QPixmap(file)
+            pix = load_preview_pixmap(file, self.preview.width(), self.preview.height())
             if not pix.isNull():
                 self.preview.setPixmap(
                     pix.scaled(
@@ -342,6 +880,36 @@ class App(QWidget):
 
         self.log_window_ref = log_window
 
+    # ------------------------------------------------------------
+    # Cross-session findings search
+    # ------------------------------------------------------------
+    def open_search(self):
+        self.search_panel = SearchPanel(self)
+        self.search_panel.show()
+
+    # ------------------------------------------------------------
+    # Telemetry
+    # ------------------------------------------------------------
+    def toggle_telemetry(self, on):
+        if on:
+            telemetry.enable()
+        else:
+            telemetry.disable()
+
+    def open_performance(self):
+        self.perf_panel = PerformancePanel()
+        self.perf_panel.show()
+
+    def closeEvent(self, event):
+        if self.export_thread is not None:
+            self.export_thread.wait()
+        self.scheduler.shutdown()
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.close_packed()
+        telemetry.flush()
+        return super().closeEvent(event)
+
     # ------------------------------------------------------------
     # Resize event for responsive preview
     # ------------------------------------------------------------
@@ -360,6 +928,12 @@ class App(QWidget):
 
 # ---------------- START APP ---------------- #
 if __name__ == "__main__":
+    # Needed for the process pool in PyInstaller builds
+    multiprocessing.freeze_support()
+    # Setting a port turns telemetry on and serves it at http://127.0.0.1:<port>/metrics
+    if os.environ.get(METRICS_PORT_ENV):
+        telemetry.enable()
+        telemetry.start_metrics_server(int(os.environ[METRICS_PORT_ENV]))
     app = QApplication(sys.argv)
     window = App()
     window.show()
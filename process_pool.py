@@ -0,0 +1,174 @@
+# process_pool.py
+"""
+Multi-process inference pool.
+
+Each worker process imports detection_core and so holds its own loaded
+models; the Python-heavy work (box parsing, comments, PIL drawing) then
+runs outside the GUI process's GIL. The parent decodes each image at
+inference resolution and hands the pixels over through
+multiprocessing.shared_memory instead of pickling the array. Persistence
+(Excel, findings store, journal) stays in the parent so every session
+still has exactly one writer.
+"""
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from utils import telemetry
+from utils.decode import decode_image
+
+
+def physical_cores():
+    """Physical core count (hyper-threads excluded) where it can be determined."""
+    try:
+        import psutil  # optional
+        n = psutil.cpu_count(logical=False)
+        if n:
+            return n
+    except ImportError:
+        pass
+
+    # Linux without psutil: count unique (physical id, core id) pairs
+    try:
+        cores = set()
+        phys = core = None
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                key, _, val = line.partition(":")
+                key = key.strip()
+                if key == "physical id":
+                    phys = val.strip()
+                elif key == "core id":
+                    core = val.strip()
+                elif not line.strip():
+                    if core is not None:
+                        cores.add((phys, core))
+                    phys = core = None
+        if core is not None:
+            cores.add((phys, core))
+        if cores:
+            return len(cores)
+    except OSError:
+        pass
+
+    return os.cpu_count() or 1
+
+
+# ------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------
+def _init_worker(threads, model_names, telemetry_on):
+    if telemetry_on:
+        telemetry.enable()
+
+    # This worker's share of the cores, applied before torch is imported
+    from utils.governor import THREADS_ENV, THREAD_ENV_VARS
+    os.environ[THREADS_ENV] = str(threads)
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+    # A spawned worker re-imports the parent's __main__, which may already have
+    # imported detection_core (and sized its governor for the whole machine)
+    # before this runs, so the share is applied to the governor explicitly too
+    import detection_core
+    detection_core.governor.budget = threads
+
+    # Load this process's own copy of the models up front, not on its first image
+    detection_core.get_models(model_names)
+    detection_core.governor.set_torch_threads(threads)
+
+
+def _analyze_in_worker(shm_name, shape, scale, image_path, results_dir, model_names, annotate,
+                       telemetry_on):
+    """Returns (analyze_image result, [(stage, ms)] spans for the parent's telemetry)."""
+    import detection_core as core
+
+    # Follow the parent's telemetry switch, which can change while the pool runs
+    if telemetry_on and not telemetry.enabled():
+        telemetry.enable()
+    elif not telemetry_on and telemetry.enabled():
+        telemetry.disable()
+
+    run_models = core.get_models(model_names) or core.get_models()
+
+    with telemetry.capture() as spans:
+        if shm_name is None:
+            # Parent could not decode; let the models read the file
+            return core.analyze_image(image_path, Path(results_dir), run_models, annotate=annotate), spans
+
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            # Zero-copy view of the parent's pixels (BGR, as Ultralytics expects for arrays)
+            pixels = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            result = core.analyze_image(image_path, Path(results_dir), run_models,
+                                        decoded=(pixels, scale), annotate=annotate)
+            del pixels
+            return result, spans
+        finally:
+            try:
+                shm.close()
+            except BufferError:
+                # Something still references the buffer; the mapping goes away with it
+                pass
+
+
+# ------------------------------------------------------------
+# Parent side
+# ------------------------------------------------------------
+class InferencePool:
+    def __init__(self, workers=None, model_names=None):
+        """model_names: models the workers preload (default: all configured models)."""
+        self.size = workers or physical_cores()
+        # Split the physical cores between workers so their thread pools don't oversubscribe
+        self.threads_per_worker = max(1, physical_cores() // self.size)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker, model_names, telemetry.enabled()),
+        )
+        print(f"[pool] Started {self.size} inference worker processes, "
+              f"{self.threads_per_worker} threads each")
+
+    def analyze(self, image_path, results_dir, run_models, annotate, min_side):
+        """
+        Run detection_core.analyze_image for one image in a worker process.
+        Blocks the calling thread until the result is back; call it from
+        several scheduler threads to keep all workers busy. The worker's
+        stage spans are merged into this thread's telemetry.
+        """
+        model_names = list(run_models)
+        telemetry_on = telemetry.enabled()
+        try:
+            with telemetry.span("decode"):
+                img, scale, stats = decode_image(image_path, min_side=min_side)
+            telemetry.gauge("decoded_mb", stats["peak_bytes"] / 1e6)
+        except Exception as e:
+            print("DECODE ERROR (worker will read the file):", e)
+            fut = self._executor.submit(_analyze_in_worker, None, None, None, image_path,
+                                        str(results_dir), model_names, annotate, telemetry_on)
+            result, spans = fut.result()
+            telemetry.merge(spans)
+            return result
+
+        rgb = np.asarray(img)
+        shm = shared_memory.SharedMemory(create=True, size=rgb.nbytes)
+        try:
+            view = np.ndarray(rgb.shape, dtype=np.uint8, buffer=shm.buf)
+            view[:] = rgb[:, :, ::-1]  # RGB -> BGR while copying in
+            del view
+            fut = self._executor.submit(_analyze_in_worker, shm.name, rgb.shape, scale, image_path,
+                                        str(results_dir), model_names, annotate, telemetry_on)
+            result, spans = fut.result()
+        finally:
+            shm.close()
+            shm.unlink()
+        telemetry.merge(spans)
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
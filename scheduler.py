@@ -0,0 +1,294 @@
+# scheduler.py
+"""
+Priority work scheduler for image sessions.
+
+Replaces the one-thread-per-batch loop: every session's images go into a
+single priority queue drained by worker threads. Interactive work (a single
+dropped image, the image being viewed) jumps ahead of background batches.
+Cancellation and pause are cooperative: handlers call `checkpoint()`
+between stages and it raises `Cancelled` or blocks while paused.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+# Lower value runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class Cancelled(Exception):
+    pass
+
+
+class SessionLimitError(RuntimeError):
+    pass
+
+
+class Session:
+    def __init__(self, session_id, paths, context):
+        self.id = session_id
+        self.paths = list(paths)
+        self.context = context if context is not None else {}
+        self.total = len(self.paths)
+        self.completed = 0
+        self.cancelled = False
+        self.in_flight = 0
+
+    @property
+    def finished(self):
+        return self.completed >= self.total or (self.cancelled and self.in_flight == 0)
+
+
+class Task:
+    __slots__ = ("session", "path", "priority", "seq", "live", "ticket")
+
+    def __init__(self, session, path, priority, seq):
+        self.session = session
+        self.path = path
+        self.priority = priority
+        self.seq = seq
+        self.live = True
+        self.ticket = None
+
+
+class WorkScheduler:
+    """
+    handler(task, checkpoint) -> result        runs on a worker thread
+    on_result(task, result, error)             after each task (error is None on success)
+    on_session_done(session)                   once per session, after its last task
+
+    With several workers, on_result is still called in dispatch order: a
+    task that finishes early waits in a reorder buffer for its predecessors.
+    """
+
+    def __init__(self, handler, on_result=None, on_session_done=None, max_sessions=2, workers=1):
+        self.handler = handler
+        self.on_result = on_result
+        self.on_session_done = on_session_done
+        self.max_sessions = max_sessions
+
+        self._heap = []
+        self._tasks = {}  # (session id, path) -> queued Task
+        self._sessions = {}
+        self._seq = itertools.count()
+        self._session_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._running = threading.Event()
+        self._running.set()
+        self._stopping = False
+
+        # Ordered delivery: dispatch ticket -> (task, result, error)
+        self._tickets = itertools.count()
+        self._next_emit = 0
+        self._finished = {}
+        self._emit_lock = threading.Lock()
+
+        # Exponential moving average of seconds per task, for ETA
+        self._avg_task_s = None
+        self._target = 0
+        self._workers = {}  # index -> thread, for every worker that hasn't decided to exit
+        self.set_workers(workers)
+
+    # ------------------------------------------------------------
+    # Submission / control
+    # ------------------------------------------------------------
+    def submit_session(self, paths, context=None, priority=PRIORITY_BATCH):
+        with self._cond:
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(
+                    f"{len(self._sessions)} sessions already running (limit {self.max_sessions})"
+                )
+            session = Session(next(self._session_ids), paths, context)
+            self._sessions[session.id] = session
+            for p in session.paths:
+                self._push(session, p, priority)
+            self._cond.notify_all()
+        self._maybe_finish(session)  # empty sessions complete immediately
+        return session
+
+    def _push(self, session, path, priority):
+        task = Task(session, path, priority, next(self._seq))
+        self._tasks[(session.id, path)] = task
+        heapq.heappush(self._heap, (priority, task.seq, task))
+
+    def promote(self, session, path, priority=PRIORITY_INTERACTIVE):
+        """Move a queued image ahead of other work. Returns False if it's not queued."""
+        with self._cond:
+            old = self._tasks.get((session.id, path))
+            if old is None or old.priority <= priority:
+                return False
+            old.live = False  # lazy deletion; the stale heap entry is skipped
+            self._push(session, path, priority)
+            self._cond.notify_all()
+            return True
+
+    def next_pending(self, session):
+        with self._cond:
+            for p in session.paths:
+                if (session.id, p) in self._tasks:
+                    return p
+        return None
+
+    def cancel(self, session):
+        with self._cond:
+            if session.cancelled:
+                return
+            session.cancelled = True
+            for p in session.paths:
+                task = self._tasks.pop((session.id, p), None)
+                if task is not None:
+                    task.live = False
+            self._cond.notify_all()
+        # Nothing running for it: finish now rather than after the next task
+        self._maybe_finish(session)
+
+    def set_workers(self, workers):
+        """Grow or shrink the worker thread count; surplus threads exit when idle."""
+        workers = max(1, workers)
+        with self._cond:
+            self._target = workers
+            # After a shrink, busy surplus threads keep their index until they exit,
+            # so fill whichever indices below the target are free
+            for i in sorted(set(range(workers)) - set(self._workers)):
+                t = threading.Thread(target=self._worker, args=(i,), name=f"scheduler-{i}", daemon=True)
+                self._workers[i] = t
+                t.start()
+            self._cond.notify_all()
+
+    @property
+    def workers(self):
+        return self._target
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopping = True
+            sessions = list(self._sessions.values())
+        for s in sessions:
+            self.cancel(s)
+        self._running.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------
+    # Progress
+    # ------------------------------------------------------------
+    def active_sessions(self):
+        with self._cond:
+            return len(self._sessions)
+
+    def running_sessions(self):
+        """Sessions not finished yet, oldest first."""
+        with self._cond:
+            return list(self._sessions.values())
+
+    def queue_length(self):
+        with self._cond:
+            return len(self._tasks)
+
+    def progress(self):
+        """(completed, total) over all active sessions."""
+        with self._cond:
+            done = sum(s.completed for s in self._sessions.values())
+            total = sum(s.total for s in self._sessions.values())
+        return done, total
+
+    def eta_seconds(self):
+        if self._avg_task_s is None:
+            return None
+        return self._avg_task_s * self.queue_length() / self._target
+
+    # ------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------
+    def _checkpoint(self, session):
+        if session.cancelled or self._stopping:
+            raise Cancelled()
+        # Block while paused, but still notice a cancel issued during the pause
+        while not self._running.wait(timeout=0.2):
+            if session.cancelled or self._stopping:
+                raise Cancelled()
+
+    def _next_task(self, index):
+        with self._cond:
+            while True:
+                if self._stopping or index >= self._target:
+                    del self._workers[index]
+                    return None
+                while self._heap and not self._heap[0][2].live:
+                    heapq.heappop(self._heap)
+                if self._heap and self._running.is_set():
+                    task = heapq.heappop(self._heap)[2]
+                    del self._tasks[(task.session.id, task.path)]
+                    task.session.in_flight += 1
+                    task.ticket = next(self._tickets)
+                    return task
+                self._cond.wait(timeout=0.5)
+
+    def _worker(self, index):
+        while True:
+            task = self._next_task(index)
+            if task is None:
+                return
+
+            session = task.session
+            result, error = None, None
+            start = time.perf_counter()
+            try:
+                result = self.handler(task, lambda: self._checkpoint(session))
+            except Cancelled as e:
+                error = e
+            except Exception as e:
+                print("SCHEDULER TASK ERROR:", task.path, e)
+                error = e
+            elapsed = time.perf_counter() - start
+
+            if not isinstance(error, Cancelled):
+                with self._cond:
+                    self._avg_task_s = elapsed if self._avg_task_s is None else \
+                        0.8 * self._avg_task_s + 0.2 * elapsed
+
+            self._deliver(task, result, error)
+
+    def _deliver(self, task, result, error):
+        # Release finished tasks strictly in ticket order; whichever worker
+        # completes the oldest outstanding ticket drains the buffer.
+        with self._emit_lock:
+            self._finished[task.ticket] = (task, result, error)
+            while self._next_emit in self._finished:
+                t, res, err = self._finished.pop(self._next_emit)
+                self._next_emit += 1
+
+                with self._cond:
+                    t.session.in_flight -= 1
+                    t.session.completed += 1
+
+                if self.on_result is not None and not isinstance(err, Cancelled):
+                    try:
+                        self.on_result(t, res, err)
+                    except Exception as e:
+                        print("SCHEDULER CALLBACK ERROR:", e)
+
+                self._maybe_finish(t.session)
+
+    def _maybe_finish(self, session):
+        with self._cond:
+            if not session.finished or session.id not in self._sessions:
+                return
+            del self._sessions[session.id]
+        if self.on_session_done is not None:
+            try:
+                self.on_session_done(session)
+            except Exception as e:
+                print("SCHEDULER CALLBACK ERROR:", e)
@@ -0,0 +1,23 @@
+# tests/conftest.py
+import pytest
+
+from inference.detector import BACKEND_ENV  # type: ignore
+
+
+@pytest.fixture
+def fake_backend(tmp_path, monkeypatch):
+    """
+    detection_core on the deterministic fake models, with a findings store
+    private to the test. Everything is undone afterwards, so tests that load
+    the real models (test_detector.py) never see the fake backend.
+    """
+    import detection_core as core  # type: ignore
+
+    monkeypatch.setenv(BACKEND_ENV, "fake")
+    monkeypatch.setattr(core, "_models", {})
+    monkeypatch.setattr(core, "_missing_models", set())
+    monkeypatch.setattr(core, "FINDINGS_DB", tmp_path / "findings.db")
+    monkeypatch.setattr(core, "_findings_store", None)
+    yield core
+    if core._findings_store is not None:
+        core._findings_store.close()
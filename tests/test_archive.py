@@ -0,0 +1,66 @@
+# tests/test_archive.py
+import pytest
+
+import utils.archive as archive  # type: ignore
+from utils.archive import PackedSession, locate, pack_session  # type: ignore
+from utils.journal import INFERRED, PERSISTED, SessionJournal  # type: ignore
+
+
+def _session(tmp_path, finished=True):
+    session = tmp_path / "2025-01-31_09-12-44"
+    (session / "uploads").mkdir(parents=True)
+    (session / "results").mkdir()
+    img = session / "uploads" / "a.jpg"
+    img.write_bytes(b"\xff\xd8jpeg-bytes")
+    (session / "results" / "annotated_a.jpg").write_bytes(b"annotated" * 1000)
+    (session / "results" / "empty.txt").write_bytes(b"")
+
+    journal = SessionJournal(session)
+    journal.queue([img.as_posix()])
+    journal.mark(img.as_posix(), PERSISTED if finished else INFERRED)
+    journal.close()
+    return session
+
+
+def test_pack_and_random_access(tmp_path):
+    session = _session(tmp_path)
+    img = (session / "uploads" / "a.jpg").as_posix()
+
+    pack = pack_session(session, remove=True)
+
+    assert not session.exists()
+    with PackedSession(pack) as packed:
+        assert set(packed.names()) >= {"uploads/a.jpg", "results/annotated_a.jpg", "journal.log"}
+        assert packed.read("uploads/a.jpg") == b"\xff\xd8jpeg-bytes"
+        assert packed.read("results/empty.txt") == b""
+        assert packed.member_for(img) == "uploads/a.jpg"
+        view = packed.view("results/annotated_a.jpg")
+        assert bytes(view[:9]) == b"annotated"
+        view.release()
+        assert packed.verify() == []
+
+    # Paths recorded before packing (Excel, findings store) still resolve
+    found, member = locate(img)
+    assert found.read(member) == b"\xff\xd8jpeg-bytes"
+    archive.close_open_packs(pack)
+    assert found._mm.closed
+
+
+def test_open_pack_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "MAX_OPEN_PACKS", 2)
+    packs = [pack_session(_session(tmp_path / str(i))) for i in range(3)]
+    try:
+        opened = [archive.open_packed(p) for p in packs]
+        # The least recently used archive was closed to stay within the limit
+        assert opened[0]._mm.closed and not opened[2]._mm.closed
+        assert archive.open_packed(packs[2]) is opened[2]
+    finally:
+        archive.close_open_packs()
+    assert all(p._mm.closed for p in opened)
+
+
+def test_unfinished_session_is_not_packed(tmp_path):
+    session = _session(tmp_path, finished=False)
+    with pytest.raises(RuntimeError):
+        pack_session(session)
+    assert session.exists()
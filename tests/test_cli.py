@@ -0,0 +1,92 @@
+# tests/test_cli.py
+import io
+import json
+import os
+import signal
+import threading
+import time
+
+import cli  # type: ignore
+from benchmarks.synthetic import make_image  # type: ignore
+
+
+def test_cli_streams_ndjson_and_gates_on_severity(tmp_path, fake_backend):
+    (tmp_path / "in" / "sub").mkdir(parents=True)
+    for i in range(3):
+        make_image(tmp_path / "in" / f"site{i}.jpg", 900, 600, seed=i)
+    make_image(tmp_path / "in" / "sub" / "site0.jpg", 900, 600, seed=7)
+    (tmp_path / "in" / "notes.txt").write_text("not an image")
+
+    out = tmp_path / "audit.ndjson"
+    args = [str(tmp_path / "in"), "-r", "--models", "ppe", "--output", str(out),
+            "--sessions-root", str(tmp_path / "sessions")]
+
+    status = cli.main(args + ["--fail-on", "critical"])
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    images, summary = records[:-1], records[-1]
+
+    assert len(images) == 4
+    assert all(d["model"] == "ppe" for r in images for d in r["detections"])
+    assert summary["type"] == "summary" and summary["images"] == 4
+    # The fake ppe model reports no-helmet (critical) on these images
+    assert summary["anomalies"]["critical"] > 0
+    assert status == cli.EXIT_ANOMALIES
+
+    # Same layout as the app: uploads (name clash renamed), results.xlsx, journal
+    session = tmp_path / "sessions" / summary["session"]
+    assert sorted(p.name for p in (session / "uploads").iterdir()) == \
+        ["site0.jpg", "site0_1.jpg", "site1.jpg", "site2.jpg"]
+    assert (session / "results" / "results.xlsx").exists()
+    assert (session / "journal.log").exists()
+    # The findings database follows the sessions root (a container's mounted volume)
+    assert fake_backend.FINDINGS_DB == tmp_path / "sessions" / "findings.db"
+    assert fake_backend.get_findings_store().session_image_count(summary["session"]) == 4
+
+    assert cli.main(args + ["--fail-on", "none"]) == cli.EXIT_OK
+
+
+def test_cli_rejects_empty_input(tmp_path):
+    assert cli.main([str(tmp_path)]) == cli.EXIT_USAGE
+
+
+def _records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_cli_counts_copy_failures_as_errors(tmp_path, fake_backend):
+    ok = make_image(tmp_path / "site.jpg", 900, 600)
+    stream = io.StringIO()
+
+    status = cli.run_batch([ok, str(tmp_path / "vanished.jpg")], stream, model_names=["ppe"],
+                           fail_on="none", sessions_root=tmp_path / "sessions")
+
+    records = _records(stream)
+    assert [r["source"] for r in records if r.get("error")] == [str(tmp_path / "vanished.jpg")]
+    assert records[-1]["errors"] == 1
+    assert status == cli.EXIT_ERRORS
+
+
+def test_cli_sigterm_cancels_with_distinct_status(tmp_path, fake_backend):
+    class SlowModel:
+        def predict(self, source, **kwargs):
+            time.sleep(0.3)
+            return []
+
+    fake_backend.get_models(["ppe"])
+    fake_backend._models["ppe"] = SlowModel()
+    files = [make_image(tmp_path / f"site{i}.jpg", 640, 480, seed=i) for i in range(6)]
+    stream = io.StringIO()
+    previous = signal.getsignal(signal.SIGTERM)
+
+    timer = threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    try:
+        status = cli.run_batch(files, stream, model_names=["ppe"], sessions_root=tmp_path / "sessions")
+    finally:
+        timer.cancel()
+
+    summary = _records(stream)[-1]
+    assert summary["cancelled"] and summary["images"] < len(files)
+    assert status == summary["exit_code"] == cli.EXIT_CANCELLED
+    # The previous handler is back once the run is over
+    assert signal.getsignal(signal.SIGTERM) == previous
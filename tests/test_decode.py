@@ -0,0 +1,31 @@
+# tests/test_decode.py
+from PIL import Image
+
+from utils.decode import decode_image  # type: ignore
+
+
+def test_jpeg_draft_decode_scales_back(tmp_path):
+    path = tmp_path / "big.jpg"
+    Image.new("RGB", (4000, 3000), (10, 20, 30)).save(path, quality=80)
+
+    img, (sx, sy), stats = decode_image(path, min_side=640)
+    assert max(img.size) >= 640
+    assert img.size[0] <= 1000  # 1/4 scale or smaller
+    assert (img.size[0] * sx, img.size[1] * sy) == (4000, 3000)
+    assert stats["full_size"] == (4000, 3000)
+
+    full, scale, _ = decode_image(path)
+    assert full.size == (4000, 3000) and scale == (1.0, 1.0)
+
+
+def test_exif_orientation_applied_before_scaling(tmp_path):
+    path = tmp_path / "portrait.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 CW to display
+    Image.new("RGB", (4000, 3000), (10, 20, 30)).save(path, quality=80, exif=exif)
+
+    img, (sx, sy), stats = decode_image(path, min_side=640)
+    # Upright (portrait) pixels, scale maps back to the upright full size
+    assert img.size[1] > img.size[0]
+    assert stats["full_size"] == (3000, 4000)
+    assert (img.size[0] * sx, img.size[1] * sy) == (3000, 4000)
@@ -0,0 +1,67 @@
+# tests/test_distributed.py
+import os
+import time
+
+from openpyxl import load_workbook
+
+from distributed import DirectoryLeaseStore, merge_finished  # type: ignore
+
+
+def test_lease_expiry_and_reassignment(tmp_path):
+    store = DirectoryLeaseStore(tmp_path)
+    jobs = store.create_batch([f"uploads/{i}.jpg" for i in range(5)], chunk_size=2, lease_seconds=60)
+    assert jobs == ["job-000000", "job-000001", "job-000002"]
+
+    first = store.claim()
+    second = store.claim()
+    assert first["files"] == ["uploads/0.jpg", "uploads/1.jpg"]
+    assert store.counts() == {"pending": 1, "leased": 2, "done": 0}
+
+    # Node holding `first` dies: its heartbeat goes stale
+    stale = time.time() - 120
+    os.utime(store.leased / f"{first['job_id']}.json", (stale, stale))
+    assert store.reclaim_expired() == [first["job_id"]]
+
+    store.complete(second["job_id"], [{"image": "uploads/2.jpg", "annotated": "", "detections": [],
+                                       "comments": []}])
+    assert store.finished_jobs() == [second["job_id"]]
+    assert store.job_results(second["job_id"])[0]["image"] == "uploads/2.jpg"
+
+    reclaimed = store.claim()
+    assert reclaimed["job_id"] == first["job_id"]
+    assert store.heartbeat(first["job_id"])
+
+
+def test_merge_saves_each_job_once_and_retries_failures(tmp_path, fake_backend, monkeypatch):
+    session = tmp_path / "session"
+    (session / "results").mkdir(parents=True)
+    store = DirectoryLeaseStore(session)
+    store.create_batch([f"uploads/{i}.jpg" for i in range(4)], chunk_size=2)
+    for _ in range(2):
+        job = store.claim()
+        dets = [{"label": "crack", "model": "m", "confidence": 0.9, "bbox": [0, 0, 5, 5]}]
+        store.complete(job["job_id"], [{"image": f, "annotated": "", "detections": dets, "comments": ["ok"]}
+                                       for f in job["files"]])
+
+    saves = []
+    real_append = fake_backend.append_to_excel
+
+    def flaky_append(results_dir, rows):
+        saves.append(len(rows))
+        if len(saves) == 1:
+            raise PermissionError("results.xlsx is open in Excel")
+        real_append(results_dir, rows)
+
+    monkeypatch.setattr(fake_backend, "append_to_excel", flaky_append)
+
+    # First job fails to save and stays unmerged; the second still merges
+    assert merge_finished(store) == 1
+    assert store.merged_jobs() == {"job-000001"}
+    assert merge_finished(store) == 1
+    assert store.merged_jobs() == {"job-000000", "job-000001"}
+    assert saves == [2, 2, 2]  # one workbook save per job attempt
+
+    ws = load_workbook(session / "results" / "results.xlsx").active
+    assert ws.max_row == 5
+    # Store rows are written once, after the workbook save succeeded
+    assert len(fake_backend.get_findings_store().query(session="session")) == 4
@@ -0,0 +1,210 @@
+# tests/test_fake_backend.py
+import os
+
+import detection_core as core  # type: ignore
+from benchmarks.synthetic import make_image  # type: ignore
+from openpyxl import load_workbook
+
+
+def test_run_inference_on_fake_models(tmp_path, fake_backend):
+    results = tmp_path / "results"
+    results.mkdir()
+    img = make_image(tmp_path / "site.jpg", 2400, 1600)
+
+    out, dets, comments = core.run_inference_on_path(img, results)
+
+    assert os.path.exists(out)
+    assert len(dets) == 5 * len(core.models)
+    assert comments
+    # Boxes come back in full-resolution coordinates despite the reduced decode
+    assert max(d["bbox"][2] for d in dets) > 640
+
+    ws = load_workbook(results / "results.xlsx").active
+    assert ws.max_row == 2
+    assert core.get_findings_store().query(session=tmp_path.name)
+
+
+def test_duplicate_waits_for_running_representative(tmp_path, fake_backend):
+    import threading
+    import time
+
+    class SlowModel:
+        calls = 0
+
+        def predict(self, source):
+            SlowModel.calls += 1
+            time.sleep(0.3)
+            return []
+
+    (tmp_path / "results").mkdir()
+    rep = make_image(tmp_path / "a.jpg", 640, 480, seed=3)
+    dup = make_image(tmp_path / "b.jpg", 640, 480, seed=3)
+    ctx = core.new_session_context(tmp_path, [rep, dup], {"slow": SlowModel()}, skip_duplicates=True)
+
+    first = threading.Thread(target=core.process_session_image, args=(rep, ctx))
+    first.start()
+    time.sleep(0.05)  # representative is mid-inference when its duplicate is dispatched
+    core.process_session_image(dup, ctx)
+    first.join()
+
+    assert SlowModel.calls == 1
+    assert core.get_findings_store().session_image_count(tmp_path.name) == 2
+
+
+def test_pool_reports_worker_stage_spans(tmp_path, fake_backend):
+    from process_pool import InferencePool
+    from utils import telemetry
+
+    img = make_image(tmp_path / "site.jpg", 1200, 800)
+    telemetry.enable()
+    pool = InferencePool(1, model_names=["ppe"])
+    try:
+        pool.analyze(img, tmp_path, core.get_models(["ppe"]), core.ANNOTATE_RASTER, 640)
+        stages = telemetry.snapshot()["stages"]
+    finally:
+        pool.shutdown()
+        telemetry.disable()
+
+    assert {"decode", "predict:ppe", "parse", "comment", "draw"} <= set(stages)
+
+
+def test_store_row_written_when_excel_fails(tmp_path, fake_backend, monkeypatch):
+    import pytest
+
+    def locked(*args, **kwargs):
+        raise PermissionError("results.xlsx is open in Excel")
+
+    save_to_excel = core.save_to_excel
+    monkeypatch.setattr(core, "save_to_excel", locked)
+    (tmp_path / "results").mkdir()
+    with pytest.raises(PermissionError):
+        core.save_results(tmp_path / "results", "a.jpg", "", [], ["comment"])
+
+    store = core.get_findings_store()
+    assert store.image_position(tmp_path.name, "a.jpg") == 0
+
+    # Resume retries the image once the workbook is writable: still one store row
+    monkeypatch.setattr(core, "save_to_excel", save_to_excel)
+    core.save_results(tmp_path / "results", "a.jpg", "", [], ["comment"])
+    assert store.session_image_count(tmp_path.name) == 1
+
+
+def test_duplicate_boxes_scaled_to_its_size(tmp_path, fake_backend):
+    from PIL import Image
+
+    (tmp_path / "results").mkdir()
+    rep = make_image(tmp_path / "a.jpg", 1600, 1200, seed=5)
+    dup = str(tmp_path / "b.jpg")
+    Image.open(rep).resize((800, 600)).save(dup, quality=90)
+    models = core.get_models(["ppe"])
+    ctx = core.new_session_context(tmp_path, [rep, dup], models, skip_duplicates=True,
+                                   annotate=core.ANNOTATE_VECTOR)
+
+    _, rep_dets, _ = core.process_session_image(rep, ctx)
+    _, dup_dets, _ = core.process_session_image(dup, ctx)
+
+    assert ctx["duplicates"] == {dup: rep}
+    assert [d["bbox"] for d in dup_dets] == \
+        [[round(v / 2) for v in d["bbox"]] for d in rep_dets]
+
+
+def test_sessions_in_the_same_second_get_their_own_folder(tmp_path):
+    folders = {core.create_session_folder(tmp_path) for _ in range(3)}
+    assert len(folders) == 3
+    assert all((f / "uploads").is_dir() for f in folders)
+
+
+def _results_bytes(results_dir):
+    return sum(p.stat().st_size for p in results_dir.iterdir() if p.is_file())
+
+
+def test_vector_mode_writes_no_annotated_copy(tmp_path, fake_backend):
+    results = tmp_path / "results"
+    results.mkdir()
+    img = make_image(tmp_path / "site.jpg", 2400, 1600)
+
+    out, dets, _ = core.run_inference_on_path(img, results, annotate=core.ANNOTATE_VECTOR)
+
+    assert out == img
+    assert not list(results.glob("annotated_*"))
+    row = next(load_workbook(results / "results.xlsx").active.iter_rows(min_row=2, values_only=True))
+    assert not row[3] and not row[4]
+    assert row[5]  # geometry is kept in the Findings column
+
+
+def test_export_annotated_images_fills_the_column(tmp_path, fake_backend):
+    results = tmp_path / "results"
+    results.mkdir()
+    imgs = [make_image(tmp_path / f"site{i}.jpg", 1200, 800, seed=i) for i in range(2)]
+    for img in imgs:
+        core.run_inference_on_path(img, results, annotate=core.ANNOTATE_VECTOR)
+
+    assert core.export_annotated_images(results) == 2
+    # Already exported rows are left alone
+    assert core.export_annotated_images(results) == 0
+
+    rows = list(load_workbook(results / "results.xlsx").active.iter_rows(min_row=2, values_only=True))
+    for img, row in zip(imgs, rows):
+        assert row[4] == f"annotated_{os.path.basename(img)}"
+        assert os.path.exists(row[3])
+    hits = core.get_findings_store().query(session=tmp_path.name)
+    assert all(h["annotated_path"].endswith(f"annotated_{os.path.basename(h['image_path'])}") for h in hits)
+
+
+def test_vector_mode_writes_an_order_of_magnitude_less(tmp_path, fake_backend):
+    img = make_image(tmp_path / "site.jpg", 2400, 1600)
+    written = {}
+    for mode in (core.ANNOTATE_RASTER, core.ANNOTATE_VECTOR):
+        results = tmp_path / mode / "results"
+        results.mkdir(parents=True)
+        core.run_inference_on_path(img, results, annotate=mode)
+        written[mode] = _results_bytes(results)
+
+    assert written[core.ANNOTATE_VECTOR] * 10 <= written[core.ANNOTATE_RASTER]
+
+
+def test_streaming_session_builds_workbook_once(tmp_path, fake_backend, monkeypatch):
+    results = tmp_path / "results"
+    results.mkdir()
+    imgs = [make_image(tmp_path / f"site{i}.jpg", 800, 600, seed=i) for i in range(3)]
+    # A row from before streaming started (e.g. a resumed session) is kept
+    core.save_to_excel(results, imgs[0], "", [], ["earlier"])
+
+    def no_reload(*args, **kwargs):
+        raise AssertionError("streaming mode reloaded results.xlsx")
+
+    ctx = core.new_session_context(tmp_path, imgs, core.get_models(["ppe"]),
+                                   annotate=core.ANNOTATE_VECTOR, stream=True)
+    load_workbook_ = core.load_workbook
+    monkeypatch.setattr(core, "load_workbook", no_reload)
+    for img in imgs:
+        core.process_session_image(img, ctx)
+    monkeypatch.setattr(core, "load_workbook", load_workbook_)
+
+    assert len((results / core.RESULTS_LOG).read_text(encoding="utf-8").splitlines()) == 3
+    assert core.finalize_results(results) == 3
+    assert not (results / core.RESULTS_LOG).exists()
+
+    rows = core.read_results(results / "results.xlsx")
+    assert [r[0] for r in rows] == [imgs[0]] + imgs
+    assert rows[0][3] == ["earlier"]
+    assert core.get_findings_store().session_image_count(tmp_path.name) == 3
+
+
+def test_pool_worker_takes_its_thread_share(fake_backend, monkeypatch):
+    import process_pool  # type: ignore
+    from utils.governor import THREADS_ENV, THREAD_ENV_VARS  # type: ignore
+
+    # The spawned worker's __main__ re-import already sized the governor for the machine
+    for var in (THREADS_ENV, *THREAD_ENV_VARS):
+        monkeypatch.setenv(var, "16")
+    monkeypatch.setattr(core.governor, "budget", 16)
+    torch_threads = []
+    monkeypatch.setattr(core.governor, "set_torch_threads", torch_threads.append)
+
+    process_pool._init_worker(2, ["ppe"], False)
+
+    assert core.governor.budget == 2
+    assert torch_threads == [2]
+    assert os.environ["OMP_NUM_THREADS"] == "2"
+    assert list(core._models) == ["ppe"]
@@ -0,0 +1,63 @@
+# tests/test_findings_store.py
+from utils.findings_store import FindingsStore  # type: ignore
+
+
+def _det(label, conf, model="ppe"):
+    return {"bbox": [1, 2, 30, 40], "confidence": conf, "label": label, "model": model}
+
+
+def test_query_filters(tmp_path):
+    store = FindingsStore(tmp_path / "findings.db")
+    store.add_image("s1", "a.jpg", [_det("no-helmet", 0.9), _det("with-helmet", 0.8)],
+                    ["Helmet not detected"], ts=1000.0)
+    store.add_image("s2", "b.jpg", [_det("no-helmet", 0.4)], ["Low confidence"], ts=2000.0)
+    store.add_image("s2", "c.jpg", [_det("barrel", 0.7, model="fire")], ["Barrel detected"], ts=3000.0)
+
+    hits = store.query(label="No-Helmet", min_confidence=0.6)
+    assert [h["image_path"] for h in hits] == ["a.jpg"]
+    assert hits[0]["bbox"] == [1, 2, 30, 40]
+
+    assert [h["image_path"] for h in store.query(since=1500.0)] == ["c.jpg", "b.jpg"]
+    assert [h["label"] for h in store.query(model="fire")] == ["barrel"]
+    assert {h["image_path"] for h in store.query(text="helmet")} == {"a.jpg"}
+
+    image_id = hits[0]["image_id"]
+    assert len(store.image_detections(image_id)) == 2
+    store.close()
+
+
+def test_set_annotated_path(tmp_path):
+    store = FindingsStore(tmp_path / "findings.db")
+    store.add_image("s1", "a.jpg", [_det("no-helmet", 0.9)], [], annotated_path="")
+    store.add_image("s2", "a.jpg", [_det("no-helmet", 0.9)], [], annotated_path="")
+
+    store.set_annotated_path("s1", "a.jpg", "results/annotated_a.jpg")
+
+    by_session = {h["session"]: h["annotated_path"] for h in store.query()}
+    assert by_session == {"s1": "results/annotated_a.jpg", "s2": ""}
+    store.close()
+
+
+def test_text_query_with_punctuation(tmp_path):
+    store = FindingsStore(tmp_path / "findings.db")
+    store.add_image("s1", "a.jpg", [_det("no-helmet", 0.9)], ["Worker's no-helmet near crane"])
+    store.add_image("s1", "b.jpg", [_det("barrel", 0.7)], ['Barrel marked "OK"'])
+
+    assert [h["image_path"] for h in store.query(text="no-helmet")] == ["a.jpg"]
+    assert [h["image_path"] for h in store.query(text="worker's crane")] == ["a.jpg"]
+    assert [h["image_path"] for h in store.query(text='"OK')] == ["b.jpg"]
+    assert store.query(text="helmet OR barrel AND") == []
+    store.close()
+
+
+def test_add_image_replaces_same_image(tmp_path):
+    store = FindingsStore(tmp_path / "findings.db")
+    store.add_image("s1", "a.jpg", [_det("no-helmet", 0.9)], ["Helmet not detected"])
+    store.add_image("s2", "a.jpg", [_det("no-helmet", 0.9)], ["Helmet not detected"])
+    store.add_image("s1", "a.jpg", [_det("barrel", 0.7), _det("barrel", 0.6)], ["Barrel detected"])
+
+    assert store.session_image_count("s1") == 1
+    assert sorted(h["label"] for h in store.query(session="s1")) == ["barrel", "barrel"]
+    assert [h["session"] for h in store.query(text="helmet")] == ["s2"]
+    assert [h["session"] for h in store.query(text="barrel")] == ["s1", "s1"]
+    store.close()
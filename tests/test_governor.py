@@ -0,0 +1,31 @@
+# tests/test_governor.py
+import utils.governor as governor_mod  # type: ignore
+from utils.governor import ResourceGovernor  # type: ignore
+
+
+def test_hill_climb_settles_on_best_level(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(governor_mod.time, "perf_counter", lambda: clock[0])
+
+    # Throughput peaks at 4 threads, oversubscription hurts above that
+    throughput = {1: 2.0, 2: 3.5, 4: 5.0, 8: 4.0, 16: 3.0}
+    applied = []
+
+    gov = ResourceGovernor(16, window_images=4, window_seconds=0.0, reprobe_windows=1000)
+    gov.tune(applied.append, 1, 16, 16, "torch threads")
+
+    for _ in range(40):
+        level = applied[-1]
+        for _ in range(4):
+            clock[0] += 1.0 / throughput[level]
+            gov.record()
+
+    assert applied[0] == 16
+    assert applied[-1] == 4
+    assert gov.config()["level"] == 4
+
+
+def test_no_knob_is_a_noop():
+    gov = ResourceGovernor(4)
+    gov.record()
+    assert gov.config()["knob"] is None
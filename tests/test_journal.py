@@ -0,0 +1,36 @@
+# tests/test_journal.py
+from utils.journal import (  # type: ignore
+    INFERRED, PERSISTED, JOURNAL_NAME, SessionJournal, read_journal, unfinished_images,
+)
+
+
+def _session(tmp_path, names):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    paths = []
+    for n in names:
+        (uploads / n).write_bytes(b"x")
+        paths.append((uploads / n).as_posix())
+    return paths
+
+
+def test_resume_skips_persisted(tmp_path):
+    a, b, c = _session(tmp_path, ["a.jpg", "b.jpg", "c.jpg"])
+
+    journal = SessionJournal(tmp_path, sync_every=2)
+    journal.queue([a, b, c])
+    journal.mark(a, INFERRED)
+    journal.mark(a, PERSISTED)
+    journal.mark(b, INFERRED)
+    journal.close()
+
+    assert read_journal(tmp_path)["uploads/a.jpg"] == PERSISTED
+    assert unfinished_images(tmp_path) == [b, c]
+
+
+def test_torn_last_line_ignored(tmp_path):
+    a, b = _session(tmp_path, ["a.jpg", "b.jpg"])
+    (tmp_path / JOURNAL_NAME).write_text(
+        "queued\tuploads/a.jpg\nqueued\tuploads/b.jpg\npersisted\tuploads/a.jpg\npersis", encoding="utf-8"
+    )
+    assert unfinished_images(tmp_path) == [b]
@@ -0,0 +1,33 @@
+# tests/test_phash.py
+from PIL import Image, ImageDraw
+
+from utils.phash import BKTree, dhash, group_near_duplicates, hamming  # type: ignore
+
+
+def _make_image(path, shift=0, invert=False):
+    img = Image.new("L", (320, 240), 255 if invert else 0)
+    draw = ImageDraw.Draw(img)
+    for i in range(0, 320, 40):
+        draw.rectangle([i + shift, 0, i + shift + 19, 239], fill=0 if invert else 255)
+    draw.ellipse([100, 60, 220, 180], fill=128)
+    img.convert("RGB").save(path, quality=90)
+    return str(path)
+
+
+def test_bktree_find():
+    tree = BKTree()
+    for h in (0b0000, 0b0001, 0b0111, 0b1111):
+        tree.add(h, h)
+    found = sorted(item for _, item in tree.find(0b0000, 1))
+    assert found == [0b0000, 0b0001]
+    assert hamming(0b0111, 0b1111) == 1
+
+
+def test_group_near_duplicates(tmp_path):
+    a = _make_image(tmp_path / "a.jpg")
+    b = _make_image(tmp_path / "b.jpg", shift=1)
+    c = _make_image(tmp_path / "c.jpg", invert=True)
+
+    assert hamming(dhash(a), dhash(b)) <= 6
+    dupes = group_near_duplicates([a, b, c])
+    assert dupes == {b: a}
@@ -0,0 +1,52 @@
+# tests/test_result_window.py
+from utils.findings_store import FindingsStore  # type: ignore
+from utils.result_window import ResultWindow  # type: ignore
+
+
+def _det(i):
+    return {"bbox": [i, i, i + 10, i + 10], "confidence": 0.9, "label": "no-helmet", "model": "ppe"}
+
+
+def test_window_stays_bounded_and_pages_back(tmp_path):
+    store = FindingsStore(tmp_path / "findings.db")
+    window = ResultWindow(store, "s1", capacity=40, page=20)
+
+    for i in range(300):
+        path = f"/sessions/s1/uploads/{i}.jpg"
+        store.add_image("s1", path, [_det(i)], [f"comment {i}"])
+        assert window.append((path, [_det(i)], [f"comment {i}"], True), path) == i
+        assert len(window._cache) <= 40
+
+    assert len(window) == 300
+    # Browse all the way back: every entry comes from the store, in order
+    for i in range(299, -1, -1):
+        out, dets, comments, overlay = window[i]
+        assert out == f"/sessions/s1/uploads/{i}.jpg"
+        assert dets[0]["bbox"] == [i, i, i + 10, i + 10]
+        assert comments == [f"comment {i}"]
+        assert len(window._cache) <= 40
+
+    # A resumed session starts with the stored results already browsable
+    assert len(ResultWindow(store, "s1")) == 300
+    store.close()
+
+
+def test_unsaved_results_stay_out_of_the_window(tmp_path):
+    store = FindingsStore(tmp_path / "findings.db")
+    window = ResultWindow(store, "s1", capacity=50, page=50)
+
+    stored = []
+    for i in range(6):
+        path = f"/sessions/s1/uploads/{i}.jpg"
+        if i == 2:
+            # Failed image: nothing in the store, so no index
+            assert window.append(("", [], ["Error: boom"], False), path) is None
+            continue
+        store.add_image("s1", path, [_det(i)], [])
+        stored.append(path)
+        window.append((path, [_det(i)], [], True), path)
+
+    assert len(window) == len(stored)
+    window._cache.clear()
+    assert [window[i][0] for i in range(len(window))] == stored
+    store.close()
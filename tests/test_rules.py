@@ -0,0 +1,39 @@
+# tests/test_rules.py
+from inference.rules import compile_rules, evaluate_rules  # type: ignore
+
+
+def _det(label, bbox, conf=0.9):
+    return {"bbox": bbox, "confidence": conf, "label": label, "model": "test"}
+
+
+RULES = compile_rules([
+    {"name": "blocked", "subject": "fire_extinguisher", "relation": "overlaps",
+     "objects": ["obstacle", "cardboard box"], "min_overlap": 0.05, "variant": "obstructed"},
+    {"name": "no_helmet", "subject": "human", "relation": "lacks_inside",
+     "objects": ["with-helmet"], "message": "no helmet"},
+    {"name": "near", "subject": "human", "relation": "near", "objects": ["machinery"],
+     "max_distance": 0.25, "message": "near machinery"},
+])
+
+
+def test_overlap_selects_variant():
+    dets = [_det("fire_extinguisher", [100, 100, 200, 300]), _det("cardboard box", [150, 250, 260, 400])]
+    messages, variants = evaluate_rules(RULES, dets)
+    assert variants == {"fire extinguisher": "obstructed"}
+
+    dets[1]["bbox"] = [400, 400, 500, 500]
+    assert evaluate_rules(RULES, dets)[1] == {}
+
+
+def test_person_without_helmet_box_inside():
+    helmeted = [_det("human", [0, 0, 100, 300]), _det("with-helmet", [20, 0, 80, 50])]
+    bare = [_det("human", [300, 0, 400, 300])]
+
+    assert "no helmet" not in evaluate_rules(RULES, helmeted)[0]
+    assert "no helmet" in evaluate_rules(RULES, helmeted + bare)[0]
+
+
+def test_near_uses_subject_diagonal():
+    person = _det("human", [0, 0, 100, 100])  # diagonal ~141 -> reach ~35 px
+    assert evaluate_rules(RULES, [person, _det("machinery", [120, 0, 200, 100])])[0] == ["no helmet", "near machinery"]
+    assert evaluate_rules(RULES, [person, _det("machinery", [200, 0, 300, 100])])[0] == ["no helmet"]
@@ -0,0 +1,105 @@
+# tests/test_scheduler.py
+import threading
+import time
+
+import pytest
+
+from scheduler import PRIORITY_INTERACTIVE, SessionLimitError, WorkScheduler  # type: ignore
+
+
+def _collecting_scheduler(handler, **kw):
+    order, finished = [], []
+    done = threading.Event()
+
+    def on_result(task, result, error):
+        order.append(task.path)
+
+    def on_session_done(session):
+        finished.append(session)
+        done.set()
+
+    sched = WorkScheduler(handler, on_result=on_result, on_session_done=on_session_done, **kw)
+    return sched, order, finished, done
+
+
+def test_interactive_jumps_ahead():
+    sched, order, finished, _ = _collecting_scheduler(lambda task, cp: None, max_sessions=2)
+    sched.pause()
+    batch = sched.submit_session(["b1", "b2", "b3"])
+    single = sched.submit_session(["s1"], priority=PRIORITY_INTERACTIVE)
+    assert sched.queue_length() == 4
+    sched.promote(batch, "b3")
+    sched.resume()
+
+    for _ in range(50):
+        if len(finished) == 2:
+            break
+        threading.Event().wait(0.05)
+    assert order == ["s1", "b3", "b1", "b2"]
+    assert {s.id for s in finished} == {batch.id, single.id}
+    sched.shutdown()
+
+
+def test_cancel_between_stages():
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler(task, checkpoint):
+        started.set()
+        release.wait(2)
+        checkpoint()  # raises Cancelled once the session is cancelled
+
+    sched, order, finished, done = _collecting_scheduler(handler, max_sessions=1)
+    session = sched.submit_session(["a", "b", "c"])
+    with pytest.raises(SessionLimitError):
+        sched.submit_session(["x"])
+
+    assert started.wait(2)
+    sched.cancel(session)
+    release.set()
+    assert done.wait(2)
+    assert order == [] and finished[0].cancelled
+    assert sched.queue_length() == 0
+    sched.shutdown()
+
+
+def test_results_delivered_in_dispatch_order():
+    delays = {"a": 0.15, "b": 0.0, "c": 0.05, "d": 0.0}
+
+    def handler(task, checkpoint):
+        time.sleep(delays[task.path])
+
+    sched, order, finished, done = _collecting_scheduler(handler, workers=4)
+    sched.submit_session(["a", "b", "c", "d"])
+    assert done.wait(2)
+    assert order == ["a", "b", "c", "d"]
+    sched.shutdown()
+
+
+def test_regrow_after_shrink_keeps_indices_unique():
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def handler(task, cp):
+        started.release()
+        release.wait(5)
+
+    sched, order, _, done = _collecting_scheduler(handler, workers=4)
+    sched.submit_session([f"{i}.jpg" for i in range(4)])
+    for _ in range(4):
+        assert started.acquire(timeout=5)
+
+    # Shrink while every worker is busy, then grow before the surplus ones exit
+    sched.set_workers(2)
+    sched.set_workers(3)
+    assert sorted(sched._workers) == [0, 1, 2, 3]
+
+    release.set()
+    assert done.wait(5)
+    for _ in range(50):
+        if sorted(sched._workers) == [0, 1, 2]:
+            break
+        time.sleep(0.05)
+    assert sorted(sched._workers) == [0, 1, 2]
+    assert len({t.name for t in sched._workers.values()}) == 3
+    sched.shutdown()
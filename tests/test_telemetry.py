@@ -0,0 +1,59 @@
+# tests/test_telemetry.py
+import json
+
+from utils import telemetry  # type: ignore
+
+
+def test_disabled_is_noop():
+    telemetry.disable()
+    with telemetry.span("decode"):
+        pass
+    telemetry.count("images")
+    assert telemetry.snapshot() == {"stages": {}, "counters": {}, "gauges": {}}
+
+
+def test_spans_and_session_file(tmp_path):
+    telemetry.enable()
+    try:
+        telemetry.bind_session(tmp_path)
+        for _ in range(5):
+            with telemetry.span("decode"):
+                pass
+        telemetry.count("detections", 3)
+        telemetry.gauge("rss_mb", 12.5)
+
+        snap = telemetry.snapshot()
+        assert snap["stages"]["decode"]["n"] == 5
+        assert snap["stages"]["decode"]["p95_ms"] >= snap["stages"]["decode"]["p50_ms"]
+        assert snap["counters"]["detections"] == 3
+
+        telemetry.flush(tmp_path)
+    finally:
+        telemetry.bind_session(None)
+        telemetry.disable()
+
+    lines = [json.loads(l) for l in (tmp_path / telemetry.TELEMETRY_FILE).read_text().splitlines()]
+    assert sum(1 for l in lines if l.get("s") == "decode") == 5
+    assert lines[-1]["counters"]["detections"] == 3
+    assert lines[-1]["gauges"]["rss_mb"] == 12.5
+
+
+def test_capture_and_merge(tmp_path):
+    telemetry.enable()
+    try:
+        with telemetry.capture() as spans:
+            with telemetry.span("predict:ppe"):
+                pass
+        assert [s for s, _ in spans] == ["predict:ppe"]
+
+        # As the parent of a pool worker: spans land in this thread's session file
+        telemetry.bind_session(tmp_path)
+        telemetry.merge([("parse", 1.5), ("comment", 0.5)])
+        assert telemetry.snapshot()["stages"]["parse"]["p50_ms"] == 1.5
+        telemetry.flush(tmp_path)
+    finally:
+        telemetry.bind_session(None)
+        telemetry.disable()
+
+    stages = [json.loads(l).get("s") for l in (tmp_path / telemetry.TELEMETRY_FILE).read_text().splitlines()]
+    assert stages[:2] == ["parse", "comment"]
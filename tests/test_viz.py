@@ -0,0 +1,20 @@
+# tests/test_viz.py
+from utils.viz import overlay_scale  # type: ignore
+
+
+def test_overlay_scale_maps_full_resolution_to_preview():
+    # Landscape 4000x3000 shown 400 px wide
+    assert overlay_scale((4000, 3000), False, 400) == 0.1
+
+
+def test_overlay_scale_uses_upright_width_for_rotated_files():
+    # Stored 4000x3000 with an EXIF rotation: upright it is 3000x4000,
+    # so a 300 px wide preview is a tenth of the upright width
+    scale = overlay_scale((4000, 3000), True, 300)
+    assert scale == 0.1
+    x2, y2 = 3000 * scale, 4000 * scale
+    assert (x2, y2) == (300, 400)
+
+
+def test_overlay_scale_without_size():
+    assert overlay_scale((0, 0), False, 300) is None
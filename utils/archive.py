@@ -0,0 +1,293 @@
+# utils/archive.py
+"""
+Packed session archives.
+
+A finished session folder (uploads, annotated copies, results.xlsx,
+journal, telemetry) is packed into one <session>.adpack file next to it:
+
+    header   8-byte magic, index offset (u64), index length (u64)
+    blobs    every file's bytes, stored as-is (images are already compressed)
+    index    JSON {relative path: [offset, size, crc32, mtime]} at the end
+
+The reader memory-maps the file and serves members by slicing the map, so
+any image or workbook is read without extracting anything.
+
+    python -m utils.archive pack sessions/2025-01-31_09-12-44 --remove
+    python -m utils.archive pack-all --older-than-days 30 --remove
+    python -m utils.archive list sessions/2025-01-31_09-12-44.adpack
+"""
+import argparse
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+from utils.journal import JOURNAL_NAME, unfinished_images
+
+PACK_EXT = ".adpack"
+MAGIC = b"ADPACK1\0"
+HEADER = struct.Struct("<8sQQ")
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent / "sessions"
+
+
+class PackedSession:
+    """Read-only, memory-mapped view of one .adpack file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fh = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, offset, length = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Not a packed session: {self.path}")
+            index = json.loads(self._mm[offset:offset + length].decode("utf-8"))
+        except Exception:
+            self._fh.close()
+            raise
+        self.session = index["session"]
+        self.created = index.get("created")
+        self._files = index["files"]
+
+    def names(self):
+        return list(self._files)
+
+    def __contains__(self, name):
+        return name in self._files
+
+    def size(self, name):
+        return self._files[name][1]
+
+    def read(self, name):
+        offset, size = self._files[name][:2]
+        return self._mm[offset:offset + size]
+
+    def view(self, name):
+        """Zero-copy memoryview of a member. Release it before close()."""
+        offset, size = self._files[name][:2]
+        return memoryview(self._mm)[offset:offset + size]
+
+    def member_for(self, path):
+        """Member name for a path recorded while the session was a folder, or None."""
+        parts = Path(str(path).replace("\\", "/")).parts
+        if self.session in parts:
+            i = len(parts) - 1 - parts[::-1].index(self.session)
+            name = "/".join(parts[i + 1:])
+        else:
+            name = str(path).replace("\\", "/")
+        return name if name in self._files else None
+
+    def verify(self):
+        """Names of members whose CRC no longer matches."""
+        bad = []
+        for name, (offset, size, crc, _) in self._files.items():
+            if zlib.crc32(self._mm[offset:offset + size]) != crc:
+                bad.append(name)
+        return bad
+
+    def extract(self, name, dest):
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(dest, "wb") as f:
+            f.write(self.read(name))
+        return dest
+
+    def close(self):
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# ------------------------------------------------------------
+# Packing
+# ------------------------------------------------------------
+def is_finished(session_folder):
+    """No unfinished images; sessions from before the journal count once results.xlsx exists."""
+    session = Path(session_folder)
+    if not (session / JOURNAL_NAME).exists():
+        return (session / "results" / "results.xlsx").exists()
+    return not unfinished_images(session)
+
+
+def pack_path_for(session_folder):
+    session = Path(session_folder)
+    return session.parent / (session.name + PACK_EXT)
+
+
+def pack_session(session_folder, out_path=None, remove=False, force=False):
+    """
+    Pack a finished session folder into one archive. Written to a temp file
+    and renamed, so a crash never leaves a half-written .adpack behind.
+    With remove=True the folder is deleted once every member verifies.
+    """
+    session = Path(session_folder)
+    if not session.is_dir():
+        raise FileNotFoundError(f"Not a session folder: {session}")
+    if not force and not is_finished(session):
+        raise RuntimeError(f"Session has unfinished images, resume it first: {session}")
+
+    out_path = Path(out_path) if out_path else pack_path_for(session)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+
+    files = {}
+    with open(tmp_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, 0, 0))
+        for p in sorted(session.rglob("*")):
+            if not p.is_file():
+                continue
+            name = p.relative_to(session).as_posix()
+            offset, crc = out.tell(), 0
+            with open(p, "rb") as f:
+                while True:
+                    chunk = f.read(1 << 20)
+                    if not chunk:
+                        break
+                    crc = zlib.crc32(chunk, crc)
+                    out.write(chunk)
+            files[name] = [offset, out.tell() - offset, crc, int(p.stat().st_mtime)]
+
+        index = json.dumps({"session": session.name, "created": int(time.time()), "files": files},
+                           separators=(",", ":")).encode("utf-8")
+        index_offset = out.tell()
+        out.write(index)
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, index_offset, len(index)))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, out_path)
+
+    if remove:
+        with PackedSession(out_path) as packed:
+            bad = packed.verify()
+        if bad:
+            raise RuntimeError(f"Packed archive failed verification ({len(bad)} members), folder kept")
+        shutil.rmtree(session)
+
+    print(f"PACKED: {session.name} -> {out_path} ({len(files)} files)")
+    return out_path
+
+
+def pack_all(root=DEFAULT_ROOT, older_than_days=0, remove=False):
+    """Pack every finished session folder under root not modified for older_than_days."""
+    cutoff = time.time() - older_than_days * 86400
+    packed = []
+    for session in sorted(Path(root).iterdir()):
+        if not (session / "uploads").is_dir() or pack_path_for(session).exists():
+            continue
+        if session.stat().st_mtime > cutoff or not is_finished(session):
+            continue
+        try:
+            packed.append(pack_session(session, remove=remove))
+        except Exception as e:
+            print("PACK ERROR:", session, e)
+    return packed
+
+
+# ------------------------------------------------------------
+# Locating files of sessions that have since been packed
+# ------------------------------------------------------------
+# Least recently used last; each entry holds a file handle and a mapping
+# (which also locks the file on Windows), so only a few stay open
+MAX_OPEN_PACKS = 8
+_open_packs = OrderedDict()
+_open_packs_lock = threading.Lock()
+
+
+def open_packed(pack_path):
+    """Cached PackedSession for a pack path (kept open for repeated reads)."""
+    key = str(pack_path)
+    with _open_packs_lock:
+        packed = _open_packs.get(key)
+        if packed is None:
+            packed = _open_packs[key] = PackedSession(pack_path)
+            while len(_open_packs) > MAX_OPEN_PACKS:
+                _close_quietly(_open_packs.popitem(last=False)[1])
+        else:
+            _open_packs.move_to_end(key)
+    return packed
+
+
+def close_open_packs(pack_path=None):
+    """Close the cached archive for pack_path, or every cached archive."""
+    with _open_packs_lock:
+        keys = [str(pack_path)] if pack_path is not None else list(_open_packs)
+        for key in keys:
+            packed = _open_packs.pop(key, None)
+            if packed is not None:
+                _close_quietly(packed)
+
+
+def _close_quietly(packed):
+    try:
+        packed.close()
+    except BufferError:
+        # A caller still holds a view(); the mapping goes away with it
+        pass
+
+
+def locate(path):
+    """(PackedSession, member) for a file path whose session folder was packed, else None."""
+    p = Path(str(path).replace("\\", "/"))
+    for folder in p.parents:
+        pack = folder.parent / (folder.name + PACK_EXT)
+        if folder.name and pack.is_file():
+            packed = open_packed(pack)
+            member = packed.member_for(p)
+            return (packed, member) if member else None
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack finished sessions into single-file archives")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("pack", help="Pack one session folder")
+    p.add_argument("session")
+    p.add_argument("--out", help="Archive path (default: <session>.adpack next to it)")
+    p.add_argument("--remove", action="store_true", help="Delete the folder once the archive verifies")
+    p.add_argument("--force", action="store_true", help="Pack even if the journal has unfinished images")
+
+    p = sub.add_parser("pack-all", help="Pack every finished session under a root folder")
+    p.add_argument("--root", default=str(DEFAULT_ROOT))
+    p.add_argument("--older-than-days", type=float, default=0)
+    p.add_argument("--remove", action="store_true")
+
+    p = sub.add_parser("list", help="List the members of an archive")
+    p.add_argument("archive")
+
+    p = sub.add_parser("extract", help="Copy one member out of an archive")
+    p.add_argument("archive")
+    p.add_argument("member")
+    p.add_argument("dest")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        pack_session(args.session, args.out, remove=args.remove, force=args.force)
+    elif args.command == "pack-all":
+        print(f"Packed {len(pack_all(args.root, args.older_than_days, args.remove))} sessions")
+    elif args.command == "list":
+        with PackedSession(args.archive) as packed:
+            for name in packed.names():
+                print(f"{packed.size(name):>12}  {name}")
+    elif args.command == "extract":
+        with PackedSession(args.archive) as packed:
+            packed.extract(args.member, args.dest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
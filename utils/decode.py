@@ -0,0 +1,64 @@
+# utils/decode.py
+import math
+import time
+
+from PIL import Image, ImageOps
+
+# EXIF orientations that swap width and height (90/270 degree rotations)
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def decode_image(img_path, min_side=None, mode="RGB"):
+    """
+    Decode an image no larger than needed.
+
+    min_side: the longest side the consumer needs (e.g. a model's imgsz).
+    For JPEGs, PIL draft mode makes libjpeg decode at 1/2, 1/4 or 1/8 scale
+    (DCT scaling) - the smallest scale whose longest side is still >= min_side.
+    Other formats, or min_side=None, decode at full resolution.
+
+    EXIF orientation is applied (as cv2.imread does), so portrait photos
+    reach the models upright.
+
+    Returns (image, (scale_x, scale_y), stats) where scale maps decoded
+    pixel coordinates back to the original image, as displayed upright.
+    """
+    start = time.perf_counter()
+    img = Image.open(img_path)
+    raw_w, raw_h = img.size
+
+    if min_side is not None and img.format == "JPEG":
+        ratio = min(1.0, min_side / max(raw_w, raw_h))
+        img.draft(mode, (math.ceil(raw_w * ratio), math.ceil(raw_h * ratio)))
+
+    # Full size as displayed, so the scale maps into upright coordinates
+    rotated = img.getexif().get(0x0112, 1) in TRANSPOSED_ORIENTATIONS
+    full_w, full_h = (raw_h, raw_w) if rotated else (raw_w, raw_h)
+
+    img = ImageOps.exif_transpose(img).convert(mode)
+    img.load()
+
+    w, h = img.size
+    stats = {
+        "full_size": (full_w, full_h),
+        "decoded_size": (w, h),
+        "decode_ms": (time.perf_counter() - start) * 1000.0,
+        # Largest buffer held for this image: the decoded pixels
+        "peak_bytes": w * h * len(img.getbands()),
+    }
+    return img, (full_w / w, full_h / h), stats
+
+
+def upright_size(img_path):
+    """(width, height) as displayed (EXIF rotation applied), from the header only."""
+    with Image.open(img_path) as img:
+        w, h = img.size
+        rotated = img.getexif().get(0x0112, 1) in TRANSPOSED_ORIENTATIONS
+    return (h, w) if rotated else (w, h)
+
+
+def format_stats(stats):
+    fw, fh = stats["full_size"]
+    w, h = stats["decoded_size"]
+    return (f"{fw}x{fh} -> {w}x{h} in {stats['decode_ms']:.1f} ms "
+            f"({stats['peak_bytes'] / 1e6:.1f} MB)")
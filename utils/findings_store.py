@@ -0,0 +1,268 @@
+# utils/findings_store.py
+"""
+Cross-session findings store (SQLite).
+
+Every processed image and each of its detections is written incrementally,
+so historical questions ("every no-helmet above 0.6 last month") are index
+lookups instead of opening one results.xlsx per session.
+"""
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id             INTEGER PRIMARY KEY,
+    session        TEXT NOT NULL,
+    image_path     TEXT NOT NULL,
+    annotated_path TEXT,
+    ts             REAL NOT NULL,
+    comments       TEXT,
+    duplicate_of   TEXT
+);
+CREATE INDEX IF NOT EXISTS images_session ON images(session, id);
+CREATE INDEX IF NOT EXISTS images_path ON images(session, image_path);
+CREATE INDEX IF NOT EXISTS images_ts ON images(ts);
+
+CREATE TABLE IF NOT EXISTS detections (
+    id         INTEGER PRIMARY KEY,
+    image_id   INTEGER NOT NULL REFERENCES images(id),
+    label      TEXT NOT NULL COLLATE NOCASE,
+    model      TEXT,
+    confidence REAL NOT NULL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+    ts         REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS det_label ON detections(label, confidence, ts);
+CREATE INDEX IF NOT EXISTS det_model ON detections(model, confidence, ts);
+CREATE INDEX IF NOT EXISTS det_conf ON detections(confidence);
+CREATE INDEX IF NOT EXISTS det_ts ON detections(ts);
+CREATE INDEX IF NOT EXISTS det_image ON detections(image_id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+    comments, content='images', content_rowid='id'
+);
+"""
+
+
+def fts_query(text):
+    """
+    User text as an FTS5 query: every word must appear. Each word is quoted
+    so punctuation ("no-helmet", "worker's") is matched as text instead of
+    being parsed as FTS5 syntax (column filters, operators).
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class FindingsStore:
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        # One connection shared by the worker (writes) and GUI (queries)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            try:
+                self._conn.executescript(FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: fall back to LIKE on comments
+                self.has_fts = False
+            self._conn.commit()
+
+    def add_image(self, session, image_path, detections, comments, annotated_path="",
+                  duplicate_of=None, ts=None):
+        """
+        Record one processed image and its detections in a single transaction.
+        Rows already stored for the same session and image are replaced, so a
+        resumed or retried image is never counted twice. Returns the image id.
+        """
+        ts = time.time() if ts is None else ts
+        comments_text = "; ".join(comments) if comments else ""
+
+        rows = []
+        for d in detections:
+            bbox = d.get("bbox") or [None] * 4
+            rows.append((d.get("label", ""), d.get("model"), float(d.get("confidence", 0.0)),
+                         *bbox[:4], ts))
+
+        with self._lock, self._conn:
+            old = self._conn.execute(
+                "SELECT id, comments FROM images WHERE session = ? AND image_path = ?",
+                (str(session), str(image_path)),
+            ).fetchall()
+            for r in old:
+                self._conn.execute("DELETE FROM detections WHERE image_id = ?", (r["id"],))
+                if self.has_fts:
+                    # External-content FTS: removal needs the indexed text
+                    self._conn.execute(
+                        "INSERT INTO comments_fts (comments_fts, rowid, comments) VALUES ('delete', ?, ?)",
+                        (r["id"], r["comments"] or ""),
+                    )
+                self._conn.execute("DELETE FROM images WHERE id = ?", (r["id"],))
+
+            cur = self._conn.execute(
+                "INSERT INTO images (session, image_path, annotated_path, ts, comments, duplicate_of) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(session), str(image_path), str(annotated_path or ""), ts, comments_text,
+                 str(duplicate_of) if duplicate_of else None),
+            )
+            image_id = cur.lastrowid
+            self._conn.executemany(
+                "INSERT INTO detections (image_id, label, model, confidence, x1, y1, x2, y2, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(image_id, *r) for r in rows],
+            )
+            if self.has_fts:
+                self._conn.execute("INSERT INTO comments_fts (rowid, comments) VALUES (?, ?)",
+                                   (image_id, comments_text))
+        return image_id
+
+    def set_annotated_path(self, session, image_path, annotated_path):
+        """Point an image's rows at a raster copy exported after it was stored."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE images SET annotated_path = ? WHERE session = ? AND image_path = ?",
+                (str(annotated_path), str(session), str(image_path)),
+            )
+
+    def query(self, label=None, model=None, min_confidence=None, since=None, until=None,
+              text=None, session=None, limit=500):
+        """
+        Detections matching every given filter, newest first.
+
+        since/until are unix timestamps; text is a full-text query on the
+        image's comments. Returns a list of dicts.
+        """
+        where, args = [], []
+        if label:
+            where.append("d.label = ?")
+            args.append(label)
+        if model:
+            where.append("d.model = ?")
+            args.append(model)
+        if min_confidence is not None:
+            where.append("d.confidence >= ?")
+            args.append(float(min_confidence))
+        if since is not None:
+            where.append("d.ts >= ?")
+            args.append(float(since))
+        if until is not None:
+            where.append("d.ts < ?")
+            args.append(float(until))
+        if session:
+            where.append("i.session = ?")
+            args.append(str(session))
+        if text and text.strip():
+            if self.has_fts:
+                where.append("d.image_id IN (SELECT rowid FROM comments_fts WHERE comments_fts MATCH ?)")
+                args.append(fts_query(text))
+            else:
+                where.append("i.comments LIKE '%' || ? || '%'")
+                args.append(text.strip())
+
+        sql = (
+            "SELECT d.label, d.model, d.confidence, d.x1, d.y1, d.x2, d.y2, d.ts, "
+            "i.id AS image_id, i.session, i.image_path, i.annotated_path, i.comments "
+            "FROM detections d JOIN images i ON i.id = d.image_id"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY d.ts DESC LIMIT ?"
+        args.append(int(limit))
+
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+
+        return [
+            {
+                "label": r["label"],
+                "model": r["model"],
+                "confidence": r["confidence"],
+                "bbox": [r["x1"], r["y1"], r["x2"], r["y2"]],
+                "ts": r["ts"],
+                "image_id": r["image_id"],
+                "session": r["session"],
+                "image_path": r["image_path"],
+                "annotated_path": r["annotated_path"],
+                "comments": r["comments"],
+            }
+            for r in rows
+        ]
+
+    def image_detections(self, image_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT label, model, confidence, x1, y1, x2, y2 FROM detections WHERE image_id = ?",
+                (image_id,),
+            ).fetchall()
+        return [
+            {"bbox": [r["x1"], r["y1"], r["x2"], r["y2"]], "confidence": r["confidence"],
+             "label": r["label"], "model": r["model"]}
+            for r in rows
+        ]
+
+    def session_image_count(self, session):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images WHERE session = ?",
+                                      (str(session),)).fetchone()[0]
+
+    def image_position(self, session, image_path):
+        """
+        Offset of an image's (latest) row in session_images() order, or None
+        if it was never stored. Stable once returned: later rows sort after it.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM images WHERE session = ? AND image_path = ?",
+                (str(session), str(image_path)),
+            ).fetchone()
+            if row[0] is None:
+                return None
+            return self._conn.execute("SELECT COUNT(*) FROM images WHERE session = ? AND id < ?",
+                                      (str(session), row[0])).fetchone()[0]
+
+    def session_images(self, session, offset=0, limit=50):
+        """
+        One page of a session's images in the order they were stored, each
+        with its detections. Two indexed queries per page.
+        """
+        with self._lock:
+            images = self._conn.execute(
+                "SELECT id, image_path, annotated_path, comments FROM images "
+                "WHERE session = ? ORDER BY id LIMIT ? OFFSET ?",
+                (str(session), int(limit), int(offset)),
+            ).fetchall()
+            ids = [r["id"] for r in images]
+            dets = self._conn.execute(
+                "SELECT image_id, label, model, confidence, x1, y1, x2, y2 FROM detections "
+                f"WHERE image_id IN ({','.join('?' * len(ids))}) ORDER BY id",
+                ids,
+            ).fetchall() if ids else []
+
+        by_image = {i: [] for i in ids}
+        for r in dets:
+            by_image[r["image_id"]].append(
+                {"bbox": [r["x1"], r["y1"], r["x2"], r["y2"]], "confidence": r["confidence"],
+                 "label": r["label"], "model": r["model"]}
+            )
+        return [
+            {
+                "image_id": r["id"],
+                "image_path": r["image_path"],
+                "annotated_path": r["annotated_path"],
+                "comments": [c for c in (r["comments"] or "").split("; ") if c],
+                "detections": by_image[r["id"]],
+            }
+            for r in images
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,178 @@
+# utils/governor.py
+"""
+CPU thread budget and adaptive concurrency for inference.
+
+Two parts:
+
+1. Static thread limits. torch's intra-op pool, OpenMP/MKL/OpenBLAS and
+   OpenCV each default to one thread per logical CPU, so several of them
+   (or several pool processes) running at once oversubscribe the machine.
+   apply_thread_limits() gives this process a budget of physical cores and
+   sets every library to it. Environment variables are only set if the user
+   hasn't, and must be set before torch is imported.
+
+2. Adaptive tuning. One integer knob (torch threads in-process, or
+   scheduler workers feeding a process pool) is hill-climbed from measured
+   images/sec: double or halve it, keep the change if throughput improved
+   by more than `tolerance`, otherwise go back and try the other way.
+   After two misses in a row it settles, then probes again every
+   `reprobe_windows` windows in case the workload changed.
+"""
+import os
+import sys
+import threading
+import time
+
+THREADS_ENV = "ANOMALY_DETECTOR_THREADS"
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+class ResourceGovernor:
+    def __init__(self, cores, window_images=8, window_seconds=5.0, tolerance=0.05, reprobe_windows=30):
+        self.cores = max(1, int(cores))
+        # A pool worker is handed its share of the machine through the environment
+        self.budget = max(1, int(os.environ.get(THREADS_ENV) or self.cores))
+        self.window_images = window_images
+        self.window_seconds = window_seconds
+        self.tolerance = tolerance
+        self.reprobe_windows = reprobe_windows
+
+        self._lock = threading.Lock()
+        self._knob = None
+        self.torch_threads = None
+        self.cv2_threads = None
+
+    # ------------------------------------------------------------
+    # Static per-library limits
+    # ------------------------------------------------------------
+    def limit_environment(self):
+        """Thread-count environment variables; only effective before torch/numpy backends start."""
+        for var in THREAD_ENV_VARS:
+            os.environ.setdefault(var, str(self.budget))
+
+    def apply_thread_limits(self):
+        """Set thread counts for every library loaded so far. Safe to call again after imports."""
+        self.limit_environment()
+
+        # OpenCV only helps torch when it has the machine to itself
+        cv2_threads = self.budget if self.budget == self.cores else 1
+        if "cv2" in sys.modules:
+            try:
+                sys.modules["cv2"].setNumThreads(cv2_threads)
+                self.cv2_threads = cv2_threads
+            except Exception as e:
+                print("[governor] cv2 thread limit failed:", e)
+
+        if "torch" in sys.modules and self.torch_threads is None:
+            torch = sys.modules["torch"]
+            try:
+                # Models run one after another; inter-op parallelism only adds threads
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass  # already fixed once parallel work has run
+            self.set_torch_threads(self.budget)
+
+        print(f"[governor] physical cores={self.cores} budget={self.budget} "
+              f"torch={self.torch_threads} cv2={self.cv2_threads} OMP={os.environ.get('OMP_NUM_THREADS')}")
+
+    def set_torch_threads(self, n):
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(int(n))
+            self.torch_threads = int(n)
+
+    # ------------------------------------------------------------
+    # Adaptive concurrency
+    # ------------------------------------------------------------
+    def tune(self, apply, low, high, start, name):
+        """Hill-climb `apply(level)` between low and high, starting at start."""
+        low, high = max(1, int(low)), max(1, int(high))
+        start = min(max(int(start), low), high)
+        with self._lock:
+            self._knob = {
+                "apply": apply, "name": name, "low": low, "high": high,
+                "level": start, "best_level": start, "best_rate": None,
+                "direction": -1 if start == high else 1, "misses": 0, "settled_windows": None,
+                "images": 0, "window_start": time.perf_counter(),
+            }
+        apply(start)
+        print(f"[governor] tuning {name} in [{low}, {high}], starting at {start}")
+
+    def untune(self):
+        with self._lock:
+            self._knob = None
+
+    def record(self, images=1):
+        """Count finished images; steps the tuned knob at the end of each measurement window."""
+        with self._lock:
+            k = self._knob
+            if k is None:
+                return
+            k["images"] += images
+            elapsed = time.perf_counter() - k["window_start"]
+            if k["images"] < self.window_images or elapsed < self.window_seconds:
+                return
+            rate = k["images"] / elapsed
+            k["images"], k["window_start"] = 0, time.perf_counter()
+            new_level = self._step(k, rate)
+
+        if new_level is not None:
+            k["apply"](new_level)
+
+    def _step(self, k, rate):
+        """Next level to apply, or None to stay. Caller holds the lock."""
+        if k["settled_windows"] is not None:
+            k["settled_windows"] += 1
+            if k["settled_windows"] < self.reprobe_windows:
+                return None
+            # Re-probe from the settled level with a fresh baseline
+            k["settled_windows"], k["misses"], k["best_rate"] = None, 0, rate
+            return self._propose(k)
+
+        if k["best_rate"] is None:
+            k["best_rate"], k["best_level"] = rate, k["level"]
+            return self._propose(k)
+
+        if rate > k["best_rate"] * (1 + self.tolerance):
+            k["best_rate"], k["best_level"], k["misses"] = rate, k["level"], 0
+            return self._propose(k)
+
+        # No better: go back to the best level and try the other direction
+        k["misses"] += 1
+        k["direction"] = -k["direction"]
+        if k["misses"] >= 2 or k["level"] == k["best_level"]:
+            k["settled_windows"] = 0
+            changed = k["level"] != k["best_level"]
+            k["level"] = k["best_level"]
+            print(f"[governor] settled: {k['name']}={k['level']} "
+                  f"({k['best_rate']:.2f} images/sec, torch threads={self.torch_threads})")
+            return k["level"] if changed else None
+        k["level"] = k["best_level"]
+        nxt = self._propose(k)
+        return nxt if nxt is not None else k["level"]
+
+    def _propose(self, k):
+        level = k["level"]
+        nxt = level * 2 if k["direction"] > 0 else level // 2
+        nxt = min(max(nxt, k["low"]), k["high"])
+        if nxt == level:
+            k["direction"] = -k["direction"]
+            nxt = min(max(level * 2 if k["direction"] > 0 else level // 2, k["low"]), k["high"])
+            if nxt == level:
+                return None
+        k["level"] = nxt
+        print(f"[governor] trying {k['name']}={nxt} (best so far {k['best_level']} "
+              f"at {k['best_rate']:.2f} images/sec)")
+        return nxt
+
+    def config(self):
+        with self._lock:
+            k = self._knob
+            return {
+                "cores": self.cores,
+                "budget": self.budget,
+                "torch_threads": self.torch_threads,
+                "cv2_threads": self.cv2_threads,
+                "knob": k["name"] if k else None,
+                "level": k["level"] if k else None,
+            }
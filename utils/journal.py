@@ -0,0 +1,122 @@
+# utils/journal.py
+import os
+import threading
+import time
+from pathlib import Path
+
+JOURNAL_NAME = "journal.log"
+
+# Per-image lifecycle, in order
+QUEUED = "queued"
+INFERRED = "inferred"
+ANNOTATED = "annotated"
+PERSISTED = "persisted"
+STATES = (QUEUED, INFERRED, ANNOTATED, PERSISTED)
+
+
+class SessionJournal:
+    """
+    Append-only write-ahead journal for one session folder.
+
+    Each line is "<state>\\t<image path relative to the session>". Lines are
+    flushed to the OS on every write; fsync is batched every `sync_every`
+    records or `sync_interval` seconds, and always on close(). A crash can
+    therefore lose at most the last batch of state changes, which only
+    means those images are processed again on resume.
+    """
+
+    def __init__(self, session_folder, sync_every=32, sync_interval=2.0):
+        self.session_folder = Path(session_folder)
+        self.path = self.session_folder / JOURNAL_NAME
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()  # several scheduler threads may mark concurrently
+
+    def _rel(self, image_path):
+        p = Path(image_path)
+        try:
+            return p.resolve().relative_to(self.session_folder.resolve()).as_posix()
+        except ValueError:
+            return p.as_posix()
+
+    def mark(self, image_path, state):
+        if state not in STATES:
+            raise ValueError(f"Unknown journal state: {state}")
+        line = f"{state}\t{self._rel(image_path)}\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            self._pending += 1
+            if self._pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+
+    def queue(self, image_paths):
+        lines = "".join(f"{QUEUED}\t{self._rel(p)}\n" for p in image_paths)
+        with self._lock:
+            self._fh.write(lines)
+            self._sync()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._fh.closed:
+                return
+            self._sync()
+            self._fh.close()
+
+
+def read_journal(session_folder):
+    """Return {relative image path: last state} in first-queued order."""
+    path = Path(session_folder) / JOURNAL_NAME
+    states = {}
+    if not path.exists():
+        return states
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            # A torn final line (crash mid-write) has no newline; ignore it
+            if not line.endswith("\n"):
+                break
+            state, _, rel = line.rstrip("\n").partition("\t")
+            if state in STATES and rel:
+                states[rel] = state
+    return states
+
+
+def unfinished_images(session_folder):
+    """
+    Absolute paths of images in the session that were never persisted.
+
+    Journaled images come first in their original order; uploads with no
+    journal record at all (crash before queueing) are appended after them.
+    """
+    session_folder = Path(session_folder)
+    states = read_journal(session_folder)
+
+    pending = [rel for rel, state in states.items() if state != PERSISTED]
+    upload_dir = session_folder / "uploads"
+    if upload_dir.is_dir():
+        for f in sorted(upload_dir.iterdir()):
+            rel = f.relative_to(session_folder).as_posix()
+            if f.is_file() and rel not in states:
+                pending.append(rel)
+
+    resolved = []
+    for rel in pending:
+        p = Path(rel)
+        p = p if p.is_absolute() else session_folder / p
+        if p.exists():
+            resolved.append(p.as_posix())
+    return resolved
@@ -0,0 +1,91 @@
+# utils/phash.py
+from PIL import Image
+
+HASH_SIZE = 8  # 8x8 difference hash -> 64-bit integer
+DUPLICATE_DISTANCE = 6  # max differing bits for two images to count as near-duplicates
+
+
+def dhash(img_path, hash_size=HASH_SIZE):
+    """Difference hash of an image as an int (hash_size * hash_size bits)."""
+    img = Image.open(img_path)
+    # JPEG draft mode decodes straight to a reduced size; the hash only needs a thumbnail
+    img.draft("L", (hash_size * 8, hash_size * 8))
+    img = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    px = img.tobytes()
+
+    value = 0
+    row_len = hash_size + 1
+    for y in range(hash_size):
+        row = px[y * row_len:(y + 1) * row_len]
+        for x in range(hash_size):
+            value = (value << 1) | (1 if row[x] < row[x + 1] else 0)
+    return value
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """BK-tree over integer hashes using Hamming distance."""
+
+    def __init__(self):
+        self.root = None  # [hash, item, {distance: child_node}]
+
+    def add(self, h, item):
+        if self.root is None:
+            self.root = [h, item, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, item, {}]
+                return
+            node = child
+
+    def find(self, h, max_distance):
+        """Return [(distance, item)] for every stored hash within max_distance."""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= max_distance:
+                found.append((d, node[1]))
+            lo, hi = d - max_distance, d + max_distance
+            for cd, child in node[2].items():
+                if lo <= cd <= hi:
+                    stack.append(child)
+        return found
+
+
+def group_near_duplicates(paths, max_distance=DUPLICATE_DISTANCE):
+    """
+    Map each near-duplicate image to the first earlier image it matches.
+
+    Returns {duplicate_path: representative_path}. Representatives always
+    appear earlier in `paths` than their duplicates, so processing in order
+    guarantees the representative's result is available first.
+    """
+    tree = BKTree()
+    duplicates = {}
+
+    for p in paths:
+        try:
+            h = dhash(p)
+        except Exception as e:
+            print("HASH ERROR (image kept):", p, e)
+            continue
+
+        matches = tree.find(h, max_distance)
+        if matches:
+            duplicates[p] = min(matches)[1]
+        else:
+            # Only representatives go into the index so chains can't drift
+            tree.add(h, p)
+
+    return duplicates
@@ -0,0 +1,72 @@
+# utils/result_window.py
+"""
+Bounded in-memory view of one session's results for Prev/Next browsing.
+
+Behaves like the list main.App keeps in normal mode (len, [i]), but holds
+at most `capacity` entries. Entries that fall out of the window are paged
+back in from the findings store, `page` images per query, when the user
+browses to them, so memory stays flat however large the batch.
+
+Indexes follow the store's order (the order images were persisted), so an
+appended result is placed at its own row's position. Results that never
+reached the store (errors, failed writes) are not part of the window. With
+several pool workers the store order can differ from arrival order by a
+few images; with in-process inference the two are identical.
+"""
+from collections import OrderedDict
+
+
+class ResultWindow:
+    def __init__(self, store, session, capacity=200, page=50):
+        self.store = store
+        self.session = str(session)
+        self.capacity = max(capacity, page)
+        self.page = page
+        self._cache = OrderedDict()  # index -> (out, detections, comments, overlay), LRU order
+        # Resuming a session: earlier results are browsable too
+        self._total = store.session_image_count(self.session)
+
+    def __len__(self):
+        return self._total
+
+    def append(self, entry, image_path):
+        """Cache a just-stored result; returns its index, or None if the store has no row for it."""
+        index = self.store.image_position(self.session, str(image_path).replace("\\", "/"))
+        if index is None:
+            return None
+        self._cache[index] = entry
+        self._cache.move_to_end(index)
+        self._total = max(self._total, index + 1)
+        self._evict()
+        return index
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._total
+        if not 0 <= index < self._total:
+            raise IndexError(index)
+
+        entry = self._cache.get(index)
+        if entry is None:
+            self._page_in(index)
+            entry = self._cache.get(index)
+            if entry is None:
+                # Not in the store (its write failed); nothing to page in
+                raise IndexError(index)
+        self._cache.move_to_end(index)
+        return entry
+
+    def _page_in(self, index):
+        # Centre the page on the requested index so Prev and Next both hit the cache
+        start = max(0, index - self.page // 2)
+        for i, row in enumerate(self.store.session_images(self.session, start, self.page)):
+            annotated = row["annotated_path"]
+            self._cache[start + i] = (annotated or row["image_path"], row["detections"],
+                                      row["comments"], not annotated)
+        if index in self._cache:
+            self._cache.move_to_end(index)
+        self._evict()
+
+    def _evict(self):
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
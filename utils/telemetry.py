@@ -0,0 +1,251 @@
+# utils/telemetry.py
+"""
+Hot-path timing spans, counters and gauges.
+
+Disabled by default. While disabled, span() returns one shared no-op
+context manager and count()/gauge() return immediately, so instrumented
+code pays a global lookup and a None check.
+
+While enabled, each span is appended to an in-memory rolling window (for
+the app's Performance panel and the optional HTTP endpoint) and to a
+buffer that is written as compact JSONL to the session folder bound to the
+current thread (<session>/telemetry.jsonl), in batches.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+TELEMETRY_FILE = "telemetry.jsonl"
+
+_active = None  # Telemetry instance while enabled
+_local = threading.local()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tel", "stage", "start")
+
+    def __init__(self, tel, stage):
+        self.tel = tel
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tel.record(self.stage, (time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+class Telemetry:
+    def __init__(self, window=200, flush_every=64):
+        self.window = window
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._stages = {}    # stage -> deque of recent ms
+        self._counters = {}
+        self._gauges = {}
+        self._buffers = {}   # session folder -> list of pending JSONL lines
+
+    def record(self, stage, ms):
+        sink = getattr(_local, "sink", None)
+        captured = getattr(_local, "captured", None)
+        if captured is not None:
+            captured.append((stage, ms))
+        with self._lock:
+            samples = self._stages.get(stage)
+            if samples is None:
+                samples = self._stages[stage] = deque(maxlen=self.window)
+            samples.append(ms)
+            if sink is not None:
+                buf = self._buffers.setdefault(sink, [])
+                buf.append(f'{{"t":{time.time():.3f},"s":"{stage}","ms":{ms:.3f}}}\n')
+                if len(buf) >= self.flush_every:
+                    self._write(sink, buf)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            stages = {k: sorted(v) for k, v in self._stages.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        out = {}
+        for stage, s in stages.items():
+            if not s:
+                continue
+            out[stage] = {
+                "n": len(s),
+                "p50_ms": round(s[len(s) // 2], 3),
+                "p95_ms": round(s[min(len(s) - 1, int(len(s) * 0.95))], 3),
+            }
+        return {"stages": out, "counters": counters, "gauges": gauges}
+
+    def flush(self, sink=None):
+        with self._lock:
+            sinks = [sink] if sink is not None else list(self._buffers)
+            for s in sinks:
+                buf = self._buffers.get(s)
+                if buf:
+                    self._write(s, buf)
+            # One summary line per flush keeps counters/gauges in the file too
+            summary = json.dumps({"t": round(time.time(), 3), "counters": self._counters,
+                                  "gauges": self._gauges}, separators=(",", ":")) + "\n"
+            for s in sinks:
+                self._append(s, summary)
+
+    def _write(self, sink, buf):
+        self._append(sink, "".join(buf))
+        buf.clear()
+
+    @staticmethod
+    def _append(sink, text):
+        try:
+            with open(Path(sink) / TELEMETRY_FILE, "a", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            print("TELEMETRY WRITE ERROR:", e)
+
+
+# ------------------------------------------------------------
+# Module-level API used by the hot path
+# ------------------------------------------------------------
+def span(stage):
+    tel = _active
+    if tel is None:
+        return _NULL_SPAN
+    return _Span(tel, stage)
+
+
+def count(name, n=1):
+    tel = _active
+    if tel is not None:
+        tel.count(name, n)
+
+
+def gauge(name, value):
+    tel = _active
+    if tel is not None:
+        tel.gauge(name, value)
+
+
+def bind_session(session_folder):
+    """Send this thread's spans to <session_folder>/telemetry.jsonl (None to stop)."""
+    _local.sink = str(session_folder) if session_folder is not None else None
+
+
+@contextmanager
+def capture():
+    """
+    Collect the spans this thread records inside the block as [(stage, ms)],
+    e.g. in a pool worker, so they can be handed back to the parent's merge().
+    """
+    spans = []
+    _local.captured = spans
+    try:
+        yield spans
+    finally:
+        _local.captured = None
+
+
+def merge(spans):
+    """Record spans measured in another process as if they ran on this thread."""
+    tel = _active
+    if tel is not None:
+        for stage, ms in spans:
+            tel.record(stage, ms)
+
+
+def enabled():
+    return _active is not None
+
+
+def enable(window=200):
+    global _active
+    if _active is None:
+        _active = Telemetry(window=window)
+    return _active
+
+
+def disable():
+    global _active
+    tel, _active = _active, None
+    if tel is not None:
+        tel.flush()
+
+
+def flush(session_folder=None):
+    tel = _active
+    if tel is not None:
+        tel.flush(str(session_folder) if session_folder is not None else None)
+
+
+def snapshot():
+    tel = _active
+    return tel.snapshot() if tel is not None else {"stages": {}, "counters": {}, "gauges": {}}
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux /proc; psutil elsewhere if installed)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    except (OSError, AttributeError, ValueError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024.0 * 1024.0)
+    except ImportError:
+        return None
+
+
+# ------------------------------------------------------------
+# Optional local metrics endpoint
+# ------------------------------------------------------------
+def start_metrics_server(port=9108, host="127.0.0.1"):
+    """Serve snapshot() as JSON on http://host:port/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = json.dumps(snapshot()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"[telemetry] Metrics at http://{host}:{port}/metrics")
+    return server
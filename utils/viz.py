@@ -1,9 +1,10 @@
 # utils/viz.py
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 
 def draw_boxes(img_path, detections, save_path):
     try:
-        img = Image.open(img_path).convert("RGB")
+        # Upright, like decode_image: detections are in EXIF-rotated coordinates
+        img = ImageOps.exif_transpose(Image.open(img_path)).convert("RGB")
     except:
         print("ERROR: Failed to load image:", img_path)
         return
@@ -34,3 +35,13 @@ def draw_boxes(img_path, detections, save_path):
 
     img.save(save_path)
     print("Annotation saved:", save_path)
+
+
+def overlay_scale(stored_size, rotated, preview_width):
+    """
+    Factor from detection coordinates (upright, full resolution) to a preview
+    preview_width pixels wide. stored_size is the file's (width, height)
+    before EXIF rotation, as QImageReader.size() reports it.
+    """
+    upright_width = stored_size[1] if rotated else stored_size[0]
+    return preview_width / upright_width if upright_width > 0 else None